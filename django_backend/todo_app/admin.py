@@ -3,7 +3,11 @@
 """
 from django.contrib import admin
 from django.utils.html import format_html
+from .counters import rebuild_counters
 from .models import Category, Task
+from .reminders import cancel_reminders, sync_reminders
+from .response_cache import invalidate_task_lists
+from .search import filter_tasks
 
 
 @admin.register(Category)
@@ -12,7 +16,7 @@ class CategoryAdmin(admin.ModelAdmin):
     list_display = ['name', 'description', 'color_display', 'created_at']
     list_filter = ['created_at']
     search_fields = ['name', 'description']
-    readonly_fields = ['id', 'created_at']
+    readonly_fields = ['id', 'created_at', 'updated_at']
     
     def color_display(self, obj):
         """Отображает цвет категории."""
@@ -35,7 +39,7 @@ class TaskAdmin(admin.ModelAdmin):
         'status', 'priority', 'category', 'created_at', 'due_date'
     ]
     search_fields = ['title', 'description', 'user__username']
-    readonly_fields = ['id', 'created_at', 'updated_at']
+    readonly_fields = ['id', 'created_at', 'updated_at', 'last_notified_at']
     date_hierarchy = 'created_at'
     
     fieldsets = (
@@ -46,7 +50,7 @@ class TaskAdmin(admin.ModelAdmin):
             'fields': ('status', 'priority', 'category', 'due_date')
         }),
         ('Временные метки', {
-            'fields': ('created_at', 'updated_at', 'completed_at'),
+            'fields': ('created_at', 'updated_at', 'completed_at', 'last_notified_at'),
             'classes': ('collapse',)
         }),
     )
@@ -62,15 +66,45 @@ class TaskAdmin(admin.ModelAdmin):
         )
     is_overdue_display.short_description = 'Просрочка'
     
+    def get_search_results(self, request, queryset, search_term):
+        """Ищет по поисковым индексам задач вместо ILIKE по всем полям."""
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        return (
+            filter_tasks(queryset, search_term)
+            | queryset.filter(user__username=search_term)
+        ), False
+    
     actions = ['mark_completed', 'mark_pending']
     
+    def _telegram_user_ids(self, queryset):
+        """Возвращает Telegram ID владельцев задач из queryset.
+        
+        queryset.update() не вызывает сигналы, поэтому после массовых
+        действий счетчики этих пользователей пересобираются, а
+        напоминания и кэш списков задач обновляются явно.
+        """
+        return set(
+            queryset.exclude(telegram_user_id=None)
+            .order_by()
+            .values_list('telegram_user_id', flat=True)
+            .distinct()
+        )
+    
     def mark_completed(self, request, queryset):
         """Отмечает задачи как завершенные."""
         from django.utils import timezone
+        telegram_user_ids = self._telegram_user_ids(queryset)
+        task_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(
             status='completed',
-            completed_at=timezone.now()
+            completed_at=timezone.now(),
+            updated_at=timezone.now()
         )
+        rebuild_counters(telegram_user_ids)
+        cancel_reminders(task_ids)
+        invalidate_task_lists(telegram_user_ids)
         self.message_user(
             request,
             f'{updated} задач отмечено как завершенные.'
@@ -79,10 +113,20 @@ class TaskAdmin(admin.ModelAdmin):
     
     def mark_pending(self, request, queryset):
         """Отмечает задачи как ожидающие."""
+        from django.utils import timezone
+        telegram_user_ids = self._telegram_user_ids(queryset)
+        task_ids = list(queryset.values_list('pk', flat=True))
         updated = queryset.update(
             status='pending',
-            completed_at=None
+            completed_at=None,
+            updated_at=timezone.now()
+        )
+        rebuild_counters(telegram_user_ids)
+        sync_reminders(
+            Task.objects.filter(pk__in=task_ids)
+            .only('id', 'status', 'due_date', 'telegram_user_id')
         )
+        invalidate_task_lists(telegram_user_ids)
         self.message_user(
             request,
             f'{updated} задач отмечено как ожидающие.'
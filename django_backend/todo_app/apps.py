@@ -3,4 +3,7 @@ from django.apps import AppConfig
 
 class TodoAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
-    name = 'todo_app'
\ No newline at end of file
+    name = 'todo_app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
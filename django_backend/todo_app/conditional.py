@@ -0,0 +1,82 @@
+"""
+Условные GET запросы (ETag / If-None-Match) для ViewSet'ов.
+"""
+import hashlib
+
+from django.db.models import Count, Max
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def etag_matches(if_none_match, etag):
+    """Слабое сравнение ETag с заголовком If-None-Match."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == '*':
+        return True
+
+    def opaque(tag):
+        tag = tag.strip()
+        return tag[2:] if tag.startswith('W/') else tag
+
+    return opaque(etag) in {opaque(tag) for tag in if_none_match.split(',')}
+
+
+class ConditionalGetMixin:
+    """Слабые ETag для list и retrieve.
+
+    ETag строится из max(updated_at) и количества строк отфильтрованного
+    queryset (одним агрегатным запросом) и полного пути запроса. Если
+    клиент прислал совпадающий If-None-Match, отдается пустой 304 без
+    выборки и сериализации строк.
+    """
+    etag_timestamp_field = 'updated_at'
+    # Версии кэша ответов (response_cache), от которых тоже зависит
+    # представление: например, названия категорий в задачах
+    etag_namespaces = ()
+
+    def get_etag_aggregates(self):
+        """Агрегаты, от которых зависит представление queryset."""
+        return {
+            'last_modified': Max(self.etag_timestamp_field),
+            'count': Count('pk'),
+        }
+
+    def compute_etag(self, queryset):
+        state = queryset.order_by().aggregate(**self.get_etag_aggregates())
+        parts = [self.request.get_full_path()]
+        parts.extend(f'{key}={state[key]}' for key in sorted(state))
+        if self.etag_namespaces:
+            from .response_cache import current_versions
+            versions = current_versions(self.etag_namespaces)
+            parts.extend(f'{namespace}={versions[namespace]}' for namespace in self.etag_namespaces)
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return f'W/"{digest}"'
+
+    def conditional_response(self, queryset, build_response):
+        """Возвращает 304 при совпадении ETag, иначе ответ build_response()."""
+        etag = self.compute_etag(queryset)
+        if etag_matches(self.request.META.get('HTTP_IF_NONE_MATCH'), etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            response['ETag'] = etag
+        return response
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(
+            queryset,
+            lambda: super(ConditionalGetMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        queryset = self.filter_queryset(self.get_queryset()).filter(
+            **{self.lookup_field: kwargs[lookup_url_kwarg]}
+        )
+        return self.conditional_response(
+            queryset,
+            lambda: super(ConditionalGetMixin, self).retrieve(request, *args, **kwargs)
+        )
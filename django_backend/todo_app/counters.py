@@ -0,0 +1,148 @@
+"""
+Материализованные счетчики задач по пользователям Telegram.
+
+Счетчики по статусам меняются инкрементально (F-выражениями) при
+создании, изменении и удалении задач. Количество просроченных задач
+зависит от текущего времени, поэтому оно пересчитывается индексным
+подзапросом при каждой записи и периодически задачей
+refresh_overdue_counters, а get_user_stats считает их на момент запроса.
+"""
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Task, UserTaskCounter
+
+
+def stats_aggregates(now=None):
+    """Возвращает условные агрегаты для всех счетчиков статистики."""
+    now = now or timezone.now()
+    aggregates = {'total': Count('id')}
+    for status_value, _ in Task.STATUS_CHOICES:
+        aggregates[status_value] = Count('id', filter=Q(status=status_value))
+    aggregates['overdue'] = Count('id', filter=Q(
+        due_date__lt=now,
+        status__in=Task.OPEN_STATUSES
+    ))
+    return aggregates
+
+
+def _overdue_tasks(telegram_user_id, now):
+    """Просроченные задачи пользователя (индекс task_user_open_due_idx)."""
+    return Task.objects.filter(
+        telegram_user_id=telegram_user_id,
+        due_date__lt=now,
+        status__in=Task.OPEN_STATUSES
+    ).order_by()
+
+
+def _overdue_subquery(telegram_user_id, now):
+    """Подзапрос количества просроченных задач пользователя."""
+    overdue = _overdue_tasks(telegram_user_id, now).values('telegram_user_id').annotate(
+        c=Count('id')
+    ).values('c')
+    return Coalesce(Subquery(overdue), 0)
+
+
+def apply_status_change(telegram_user_id, old_status=None, new_status=None):
+    """Переносит задачу между счетчиками статусов пользователя.
+
+    old_status=None означает создание задачи, new_status=None - удаление.
+    Просроченные задачи пересчитываются в том же UPDATE.
+    """
+    if telegram_user_id is None:
+        return
+
+    deltas = {}
+    if old_status != new_status:
+        if old_status:
+            deltas[old_status] = F(old_status) - 1
+        if new_status:
+            deltas[new_status] = F(new_status) + 1
+
+    now = timezone.now()
+    updated = UserTaskCounter.objects.filter(telegram_user_id=telegram_user_id).update(
+        overdue=_overdue_subquery(telegram_user_id, now),
+        updated_at=now,
+        **deltas
+    )
+    if not updated:
+        # Строки еще нет (первая задача или таблица не построена) -
+        # считаем с нуля, изменение уже записано в таблицу задач
+        rebuild_counters([telegram_user_id])
+
+
+def rebuild_counters(telegram_user_ids=None):
+    """Пересобирает счетчики из таблицы задач.
+
+    Без аргументов пересобирает таблицу целиком, иначе - только
+    для указанных пользователей. Возвращает количество строк.
+    """
+    queryset = Task.objects.filter(telegram_user_id__isnull=False)
+    if telegram_user_ids is not None:
+        telegram_user_ids = set(telegram_user_ids) - {None}
+        if not telegram_user_ids:
+            return 0
+        queryset = queryset.filter(telegram_user_id__in=telegram_user_ids)
+
+    aggregates = stats_aggregates()
+    aggregates.pop('total')
+    rows = queryset.order_by().values('telegram_user_id').annotate(**aggregates)
+    counters = {
+        row['telegram_user_id']: UserTaskCounter(**row)
+        for row in rows
+    }
+
+    if telegram_user_ids is None:
+        UserTaskCounter.objects.exclude(telegram_user_id__in=list(counters)).delete()
+    else:
+        # Пользователи без задач получают нулевые счетчики
+        for telegram_user_id in telegram_user_ids:
+            counters.setdefault(
+                telegram_user_id,
+                UserTaskCounter(telegram_user_id=telegram_user_id)
+            )
+
+    now = timezone.now()
+    for counter in counters.values():
+        counter.updated_at = now
+
+    UserTaskCounter.objects.bulk_create(
+        counters.values(),
+        update_conflicts=True,
+        unique_fields=['telegram_user_id'],
+        update_fields=list(aggregates) + ['updated_at'],
+        batch_size=1000,
+    )
+    return len(counters)
+
+
+def refresh_overdue_counters():
+    """Пересчитывает просроченные задачи во всех счетчиках одним UPDATE."""
+    now = timezone.now()
+    overdue = Task.objects.filter(
+        telegram_user_id=OuterRef('telegram_user_id'),
+        due_date__lt=now,
+        status__in=Task.OPEN_STATUSES
+    ).order_by().values('telegram_user_id').annotate(c=Count('id')).values('c')
+    return UserTaskCounter.objects.update(
+        overdue=Coalesce(Subquery(overdue), 0),
+        updated_at=now
+    )
+
+
+def get_user_stats(telegram_user_id):
+    """Возвращает статистику пользователя.
+    
+    Счетчики по статусам читаются из материализованной строки, а
+    просроченные задачи считаются на момент запроса: строка обновляет
+    overdue только при записи и раз в минуту, и задача со сроком,
+    истекшим после этого, не попала бы в статистику.
+    """
+    counter = UserTaskCounter.objects.filter(telegram_user_id=telegram_user_id).first()
+    if counter is None:
+        rebuild_counters([telegram_user_id])
+        counter = UserTaskCounter.objects.get(telegram_user_id=telegram_user_id)
+    stats = counter.as_stats()
+    stats['overdue'] = _overdue_tasks(telegram_user_id, timezone.now()).count()
+    return stats
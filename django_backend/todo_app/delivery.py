@@ -0,0 +1,347 @@
+"""
+Пакетная доставка уведомлений в Telegram.
+
+Сообщения складываются в очередь (список Redis), а задача
+drain_delivery_queue выбирает их пачками и отправляет через общий
+пул HTTP соединений. Скорость ограничивается двумя token bucket:
+глобальным и на каждый чат (по умолчанию 30 и 1 сообщение в секунду,
+как у Telegram). Сообщения, упершиеся в лимит чата, 429 или ошибку
+сервера, откладываются в sorted set с временем следующей попытки
+(экспоненциальная задержка со случайным разбросом).
+"""
+import heapq
+import json
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+QUEUE_KEY = 'todo:delivery:queue'
+DELAYED_KEY = 'todo:delivery:delayed'
+LOCK_KEY = 'todo:delivery:lock'
+
+DELIVERED = 'delivered'
+RETRY = 'retry'
+FAILED = 'failed'
+
+
+class TokenBucket:
+    """Потокобезопасный token bucket: rate токенов в секунду."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = float(rate)
+        self.capacity = float(capacity or max(1.0, self.rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self):
+        """Берет токен. Возвращает 0 или сколько секунд ждать следующего."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+    def acquire(self):
+        """Ждет, пока появится токен."""
+        while True:
+            wait = self.try_acquire()
+            if not wait:
+                return
+            time.sleep(wait)
+
+
+class RedisDeliveryQueue:
+    """Очередь сообщений в Redis: список готовых + sorted set отложенных."""
+
+    # Атомарно переносит наступившие отложенные сообщения в очередь
+    PROMOTE_SCRIPT = """
+    local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+    for _, item in ipairs(due) do
+        redis.call('ZREM', KEYS[1], item)
+        redis.call('RPUSH', KEYS[2], item)
+    end
+    return #due
+    """
+
+    def __init__(self, client=None):
+        self.redis = client or get_redis(settings.DELIVERY_REDIS_URL)
+        self._promote = self.redis.register_script(self.PROMOTE_SCRIPT)
+
+    def push(self, messages):
+        payloads = [json.dumps(message, ensure_ascii=False) for message in messages]
+        if payloads:
+            self.redis.rpush(QUEUE_KEY, *payloads)
+        return len(payloads)
+
+    def pop(self, count):
+        self._promote(keys=[DELAYED_KEY, QUEUE_KEY], args=[time.time(), count])
+        items = self.redis.lpop(QUEUE_KEY, count) or []
+        return [json.loads(item) for item in items]
+
+    def defer(self, message, delay):
+        # Случайное поле делает одинаковые сообщения разными членами множества
+        message = {**message, 'nonce': random.getrandbits(32)}
+        self.redis.zadd(DELAYED_KEY, {json.dumps(message, ensure_ascii=False): time.time() + delay})
+
+    def size(self):
+        return self.redis.llen(QUEUE_KEY) + self.redis.zcard(DELAYED_KEY)
+
+    def lock(self, timeout):
+        return self.redis.lock(LOCK_KEY, timeout=timeout)
+
+
+class InMemoryDeliveryQueue:
+    """Очередь в памяти процесса с тем же интерфейсом (для бенчмарков)."""
+
+    class _Lock:
+        def acquire(self, blocking=True):
+            return True
+
+        def release(self):
+            pass
+
+    def __init__(self):
+        self._ready = deque()
+        self._delayed = []
+        self._counter = 0
+        self._mutex = threading.Lock()
+
+    def push(self, messages):
+        with self._mutex:
+            before = len(self._ready)
+            self._ready.extend(messages)
+            return len(self._ready) - before
+
+    def pop(self, count):
+        with self._mutex:
+            now = time.time()
+            while self._delayed and self._delayed[0][0] <= now:
+                self._ready.append(heapq.heappop(self._delayed)[2])
+            return [self._ready.popleft() for _ in range(min(count, len(self._ready)))]
+
+    def defer(self, message, delay):
+        with self._mutex:
+            self._counter += 1
+            heapq.heappush(self._delayed, (time.time() + delay, self._counter, message))
+
+    def size(self):
+        with self._mutex:
+            return len(self._ready) + len(self._delayed)
+
+    def lock(self, timeout):
+        return self._Lock()
+
+
+class TelegramSender:
+    """Отправка одного сообщения через общий пул HTTP соединений."""
+
+    def __init__(self, base_url, pool_size=10, timeout=10):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def send(self, message):
+        """Возвращает (результат, retry_after)."""
+        try:
+            response = self.session.post(
+                f"{self.base_url}/send_notification",
+                json={'user_id': message['chat_id'], 'message': message['text']},
+                timeout=self.timeout
+            )
+        except requests.RequestException as e:
+            logger.warning(f"Telegram delivery to {message['chat_id']} failed: {e}")
+            return RETRY, None
+
+        if response.status_code == 200:
+            return DELIVERED, None
+        if response.status_code == 429:
+            return RETRY, self._retry_after(response)
+        if response.status_code >= 500:
+            return RETRY, None
+        logger.error(
+            f"Telegram delivery to {message['chat_id']} rejected: {response.status_code}"
+        )
+        return FAILED, None
+
+    @staticmethod
+    def _retry_after(response):
+        header = response.headers.get('Retry-After')
+        if header:
+            try:
+                return float(header)
+            except ValueError:
+                pass
+        try:
+            return float(response.json()['parameters']['retry_after'])
+        except (ValueError, KeyError, TypeError):
+            return None
+
+
+class DeliveryWorker:
+    """Выбирает сообщения пачками и отправляет их с учетом лимитов."""
+
+    def __init__(self, queue, sender, global_rate=30, per_chat_rate=1, batch_size=100,
+                 concurrency=8, max_attempts=5, retry_base=1.0, max_chats=10000):
+        self.queue = queue
+        self.sender = sender
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.max_chats = max_chats
+        self._chat_buckets = OrderedDict()
+        self._executor = ThreadPoolExecutor(max_workers=concurrency)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.per_chat_rate, capacity=1)
+            while len(self._chat_buckets) > self.max_chats:
+                self._chat_buckets.popitem(last=False)
+        else:
+            self._chat_buckets.move_to_end(chat_id)
+        return bucket
+
+    def backoff(self, attempts, retry_after=None):
+        """Задержка перед повторной попыткой (full jitter)."""
+        if retry_after:
+            return retry_after + random.uniform(0, self.retry_base)
+        return random.uniform(0, self.retry_base * 2 ** attempts)
+
+    def _deliver(self, message):
+        self.global_bucket.acquire()
+        outcome, retry_after = self.sender.send(message)
+        if outcome != RETRY:
+            return outcome
+
+        attempts = message.get('attempts', 0) + 1
+        if attempts >= self.max_attempts:
+            logger.error(f"Telegram delivery to {message['chat_id']} gave up after {attempts} attempts")
+            return FAILED
+        self.queue.defer({**message, 'attempts': attempts}, self.backoff(attempts, retry_after))
+        return RETRY
+
+    def drain(self, time_budget=50.0):
+        """Отправляет сообщения, пока очередь не опустеет или не выйдет время."""
+        started = time.monotonic()
+        metrics = {'delivered': 0, 'retried': 0, 'failed': 0, 'throttled': 0, 'batches': 0}
+
+        while time.monotonic() - started < time_budget:
+            batch = self.queue.pop(self.batch_size)
+            if not batch:
+                break
+            metrics['batches'] += 1
+
+            ready = []
+            for message in batch:
+                wait = self._chat_bucket(message['chat_id']).try_acquire()
+                if wait:
+                    # Лимит чата: откладываем, не блокируя остальные чаты
+                    self.queue.defer(message, wait)
+                    metrics['throttled'] += 1
+                else:
+                    ready.append(message)
+
+            for outcome in self._executor.map(self._deliver, ready):
+                metrics[{DELIVERED: 'delivered', RETRY: 'retried', FAILED: 'failed'}[outcome]] += 1
+
+        metrics['elapsed'] = round(time.monotonic() - started, 3)
+        return metrics
+
+
+def build_message(chat_id, text):
+    return {'chat_id': chat_id, 'text': text, 'attempts': 0}
+
+
+_queue = None
+_worker = None
+_init_lock = threading.Lock()
+
+
+def get_queue():
+    """Очередь процесса (одно подключение к Redis на процесс)."""
+    global _queue
+    with _init_lock:
+        if _queue is None:
+            _queue = RedisDeliveryQueue()
+        return _queue
+
+
+def get_worker():
+    """Воркер процесса: лимиты чатов сохраняются между запусками."""
+    global _worker
+    queue = get_queue()
+    with _init_lock:
+        if _worker is None:
+            _worker = DeliveryWorker(
+                queue=queue,
+                sender=TelegramSender(
+                    settings.TELEGRAM_BOT_API_URL,
+                    pool_size=settings.DELIVERY_CONCURRENCY
+                ),
+                global_rate=settings.DELIVERY_GLOBAL_RATE,
+                per_chat_rate=settings.DELIVERY_PER_CHAT_RATE,
+                batch_size=settings.DELIVERY_BATCH_SIZE,
+                concurrency=settings.DELIVERY_CONCURRENCY,
+                max_attempts=settings.DELIVERY_MAX_ATTEMPTS,
+                retry_base=settings.DELIVERY_RETRY_BASE,
+            )
+        return _worker
+
+
+def enqueue_messages(messages):
+    """Ставит в очередь сообщения [(telegram_user_id, text), ...]."""
+    return get_queue().push(
+        build_message(chat_id, text) for chat_id, text in messages
+    )
+
+
+def drain():
+    """Разбирает очередь; одновременно работает только один разборщик.
+
+    Единственный разборщик делает лимиты процесса глобальными.
+    """
+    if not settings.TELEGRAM_BOT_API_URL:
+        logger.warning("TELEGRAM_BOT_API_URL not configured")
+        return None
+
+    worker = get_worker()
+    budget = settings.DELIVERY_DRAIN_SECONDS
+    lock = worker.queue.lock(timeout=budget + 30)
+    if not lock.acquire(blocking=False):
+        return None
+    try:
+        metrics = worker.drain(budget)
+    finally:
+        try:
+            lock.release()
+        except Exception as e:
+            logger.warning(f"Delivery lock release failed: {e}")
+
+    if metrics['batches']:
+        logger.info(
+            f"Delivery: {metrics['delivered']} delivered, {metrics['retried']} retried, "
+            f"{metrics['failed']} failed, {metrics['throttled']} throttled "
+            f"in {metrics['batches']} batches, {metrics['elapsed']}s"
+        )
+    return metrics
@@ -0,0 +1,302 @@
+"""
+Генератор первичных ключей для моделей ToDo приложения.
+
+ID в стиле snowflake: 62 бита упаковываются в 12 символов base36
+(0-9a-z), поэтому помещаются в существующий CharField(max_length=12):
+
+    40 бит - миллисекунды от EPOCH_MS (хватит примерно до 2059 года)
+    10 бит - номер воркера (0..1023)
+    12 бит - порядковый номер внутри миллисекунды (0..4095)
+
+Строки фиксированной длины сортируются так же, как числа, поэтому
+новые ключи монотонно растут и дописываются в конец B-дерева индекса.
+
+Два процесса с одним номером воркера выдали бы одинаковые ID в одну
+миллисекунду, поэтому каждый процесс при первом ID арендует свободный
+номер в Redis (ID_WORKER_REDIS_URL, см. WorkerIdLease).
+"""
+import atexit
+import hashlib
+import logging
+import os
+import random
+import socket
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+
+ID_LENGTH = 12
+ALPHABET = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+# 2025-01-01T00:00:00Z
+EPOCH_MS = 1735689600000
+
+TIMESTAMP_BITS = 40
+WORKER_BITS = 10
+SEQUENCE_BITS = 12
+
+MAX_WORKER_ID = (1 << WORKER_BITS) - 1
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+
+logger = logging.getLogger(__name__)
+
+
+def encode_base36(value, length=ID_LENGTH):
+    """Кодирует неотрицательное число в base36 фиксированной длины."""
+    chars = []
+    while value:
+        value, remainder = divmod(value, 36)
+        chars.append(ALPHABET[remainder])
+    encoded = ''.join(reversed(chars)).rjust(length, '0')
+    if len(encoded) > length:
+        raise OverflowError(f"Value does not fit into {length} base36 chars")
+    return encoded
+
+
+# Номер дочернего процесса пула celery (см. set_process_index)
+_process_index = None
+
+# Ключ аренды номера воркера в Redis
+LEASE_KEY = 'id_worker:{}'
+
+
+def set_process_index(index):
+    """Запоминает номер дочернего процесса пула (0, 1, ...).
+
+    Нужен только без аренды номеров (ID_WORKER_REDIS_URL пуст).
+    Вызывается в дочернем процессе сразу после fork, до первого ID.
+    """
+    global _process_index
+    _process_index = index
+
+
+def _check_worker_id(worker_id):
+    if not 0 <= worker_id <= MAX_WORKER_ID:
+        raise ValueError(f"worker_id must be in 0..{MAX_WORKER_ID}")
+    return worker_id
+
+
+class WorkerIdLease:
+    """Аренда номера воркера в Redis.
+
+    Процесс занимает свободный номер (SET NX с TTL), начиная с
+    preferred, и продлевает аренду перед выдачей ID, если с последнего
+    продления прошла треть TTL. Если аренда потеряна (процесс простоял
+    дольше TTL, и номер занял другой процесс), перед следующим ID
+    берется новый номер.
+    """
+
+    # Продлевает или снимает аренду, только если номер еще наш
+    REFRESH_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('EXPIRE', KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+    RELEASE_SCRIPT = """
+    if redis.call('GET', KEYS[1]) == ARGV[1] then
+        return redis.call('DEL', KEYS[1])
+    end
+    return 0
+    """
+
+    def __init__(self, client, ttl, preferred=0):
+        self.redis = client
+        self.ttl = ttl
+        self.preferred = preferred
+        self.pid = os.getpid()
+        self.token = f'{socket.gethostname()}:{self.pid}:{uuid.uuid4().hex}'
+        self.worker_id = None
+        self._refreshed_at = 0.0
+        self._refresh = client.register_script(self.REFRESH_SCRIPT)
+        self._release = client.register_script(self.RELEASE_SCRIPT)
+
+    def acquire(self):
+        """Занимает первый свободный номер, начиная с preferred."""
+        for offset in range(MAX_WORKER_ID + 1):
+            worker_id = (self.preferred + offset) & MAX_WORKER_ID
+            if self.redis.set(LEASE_KEY.format(worker_id), self.token, nx=True, ex=self.ttl):
+                self.worker_id = worker_id
+                self._refreshed_at = time.monotonic()
+                return worker_id
+        raise RuntimeError(f"All {MAX_WORKER_ID + 1} snowflake worker IDs are leased")
+
+    def current(self):
+        """Номер воркера, под которым можно выдать следующий ID."""
+        if self.worker_id is None:
+            return self.acquire()
+        elapsed = time.monotonic() - self._refreshed_at
+        if elapsed < self.ttl / 3:
+            return self.worker_id
+        try:
+            refreshed = self._refresh(keys=[LEASE_KEY.format(self.worker_id)], args=[self.token, self.ttl])
+        except Exception as e:
+            # Пока TTL не истек, номер все еще наш
+            if elapsed < self.ttl:
+                logger.warning(f"Worker ID lease refresh failed: {e}")
+                return self.worker_id
+            raise
+        if not refreshed:
+            logger.warning(f"Worker ID {self.worker_id} lease lost, acquiring a new one")
+            self.worker_id = None
+            return self.acquire()
+        self._refreshed_at = time.monotonic()
+        return self.worker_id
+
+    def release(self):
+        """Освобождает номер (только в процессе, который его занял)."""
+        if self.worker_id is None or os.getpid() != self.pid:
+            return
+        try:
+            self._release(keys=[LEASE_KEY.format(self.worker_id)], args=[self.token])
+        except Exception as e:
+            logger.warning(f"Worker ID lease release failed: {e}")
+        self.worker_id = None
+
+
+def _static_worker_id():
+    """Номер воркера без аренды: ID_WORKER_ID или хеш хоста и PID.
+
+    Процесс с таким номером должен быть единственным: дочерние процессы
+    пула celery получают ID_WORKER_ID + 1 + номер процесса, остальным
+    нужен свой ID_WORKER_ID. Хеш используется только при DEBUG - хеши
+    хостов могут совпасть.
+    """
+    configured = os.getenv('ID_WORKER_ID')
+    if configured is not None:
+        worker_id = int(configured)
+        if _process_index is not None:
+            worker_id += 1 + _process_index
+        return worker_id
+    if not settings.DEBUG:
+        raise ImproperlyConfigured(
+            'Set ID_WORKER_REDIS_URL to lease worker IDs, or a unique ID_WORKER_ID per process'
+        )
+    # Воркеры одной машины обычно имеют соседние PID, поэтому PID
+    # прибавляется к хешу хоста, а не хешируется вместе с ним
+    host_hash = hashlib.blake2b(socket.gethostname().encode(), digest_size=4).digest()
+    return (int.from_bytes(host_hash, 'big') + os.getpid()) & MAX_WORKER_ID
+
+
+def lease_worker_id():
+    """Арендует номер воркера для текущего процесса.
+
+    Возвращает WorkerIdLease или None, если аренда выключена
+    (ID_WORKER_REDIS_URL пуст) или Redis недоступен при DEBUG.
+    ID_WORKER_ID задает номер, с которого начинается поиск свободного.
+    """
+    url = getattr(settings, 'ID_WORKER_REDIS_URL', '')
+    if not url:
+        return None
+    from .redis_client import get_redis
+
+    configured = os.getenv('ID_WORKER_ID')
+    preferred = int(configured) if configured is not None else random.randrange(MAX_WORKER_ID + 1)
+    lease = WorkerIdLease(
+        get_redis(url),
+        ttl=getattr(settings, 'ID_WORKER_LEASE_TTL', 60),
+        preferred=preferred,
+    )
+    try:
+        lease.acquire()
+    except Exception as e:
+        # Без Redis номер не занять; при разработке обходимся статическим
+        if not settings.DEBUG:
+            raise
+        logger.warning(f"Worker ID lease unavailable, using static worker ID: {e}")
+        return None
+    atexit.register(lease.release)
+    return lease
+
+
+class SnowflakeIdGenerator:
+    """Потокобезопасный генератор упорядоченных по времени ID.
+
+    Без явного worker_id номер воркера определяется при первом ID в
+    каждом процессе: процессы, созданные fork (воркеры gunicorn и
+    celery), и реплики сервиса арендуют разные номера в Redis.
+    """
+
+    def __init__(self, worker_id=None):
+        self._fixed = worker_id is not None
+        self.worker_id = _check_worker_id(worker_id) if self._fixed else None
+        self._lease = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._last_ms = -1
+        self._sequence = 0
+
+    def _current_worker_id(self):
+        """Номер воркера процесса; после fork определяется заново."""
+        if self._fixed:
+            return self.worker_id
+        if os.getpid() != self._pid:
+            inherited = self._pid is not None
+            self._lease = lease_worker_id()
+            if self._lease is not None:
+                worker_id = self._lease.worker_id
+            else:
+                if inherited and os.getenv('ID_WORKER_ID') is not None and _process_index is None:
+                    # Номер родителя у нескольких дочерних процессов дал бы
+                    # одинаковые ID
+                    raise ImproperlyConfigured(
+                        'Forked process has no pool index: call ids.set_process_index() after fork'
+                    )
+                worker_id = _static_worker_id()
+            self.worker_id = _check_worker_id(worker_id)
+            self._pid = os.getpid()
+            self._last_ms = -1
+            self._sequence = 0
+        elif self._lease is not None:
+            self.worker_id = self._lease.current()
+        return self.worker_id
+
+    def next_int(self):
+        """Возвращает следующий ID в виде числа."""
+        with self._lock:
+            worker_id = self._current_worker_id()
+            now_ms = int(time.time() * 1000)
+
+            # Часы ушли назад - продолжаем от последнего значения,
+            # чтобы не выдать повторяющийся ID
+            if now_ms < self._last_ms:
+                now_ms = self._last_ms
+
+            if now_ms == self._last_ms:
+                self._sequence = (self._sequence + 1) & MAX_SEQUENCE
+                if self._sequence == 0:
+                    # Последовательность исчерпана - ждем следующую миллисекунду
+                    while now_ms <= self._last_ms:
+                        time.sleep(0.0001)
+                        now_ms = max(int(time.time() * 1000), now_ms)
+            else:
+                self._sequence = 0
+
+            self._last_ms = now_ms
+            timestamp = now_ms - EPOCH_MS
+            return (
+                (timestamp << (WORKER_BITS + SEQUENCE_BITS))
+                | (worker_id << SEQUENCE_BITS)
+                | self._sequence
+            )
+
+    def next_id(self):
+        """Возвращает следующий ID в виде строки из 12 символов."""
+        return encode_base36(self.next_int())
+
+
+def legacy_md5_id():
+    """Прежняя схема: md5 от времени в микросекундах (для сравнения)."""
+    timestamp = str(int(time.time() * 1000000))
+    return hashlib.md5(timestamp.encode()).hexdigest()[:ID_LENGTH]
+
+
+_generator = SnowflakeIdGenerator()
+
+
+def next_id():
+    """Возвращает следующий ID процесса."""
+    return _generator.next_id()
@@ -0,0 +1,106 @@
+"""
+Команда для замера пропускной способности доставки уведомлений.
+"""
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.core.management.base import BaseCommand
+from todo_app.delivery import (
+    DeliveryWorker, InMemoryDeliveryQueue, RedisDeliveryQueue, TelegramSender, build_message
+)
+
+
+class StubTelegramHandler(BaseHTTPRequestHandler):
+    """Заглушка /send_notification: отвечает 200 или, изредка, 429/500."""
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    fail_rate = 0.0
+    latency = 0.0
+    received = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length', 0))
+        json.loads(self.rfile.read(length) or b'{}')
+        if self.latency:
+            time.sleep(self.latency)
+
+        roll = random.random()
+        if roll < self.fail_rate / 2:
+            status, body = 429, {'ok': False, 'parameters': {'retry_after': 1}}
+        elif roll < self.fail_rate:
+            status, body = 500, {'ok': False}
+        else:
+            status, body = 200, {'ok': True}
+            with self.lock:
+                type(self).received += 1
+
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = 'Прогоняет уведомления через DeliveryWorker и локальную заглушку Telegram'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--messages', type=int, default=2000, help='Количество сообщений')
+        parser.add_argument('--chats', type=int, default=500, help='Количество разных чатов')
+        parser.add_argument('--global-rate', type=float, default=1000, help='Глобальный лимит, msg/s')
+        parser.add_argument('--per-chat-rate', type=float, default=1, help='Лимит на чат, msg/s')
+        parser.add_argument('--concurrency', type=int, default=8, help='Параллельных отправок')
+        parser.add_argument('--batch-size', type=int, default=100, help='Размер пачки')
+        parser.add_argument('--fail-rate', type=float, default=0.0, help='Доля ответов 429/500')
+        parser.add_argument('--latency', type=float, default=0.005, help='Задержка заглушки, с')
+        parser.add_argument('--redis', action='store_true', help='Использовать очередь в Redis')
+
+    def handle(self, *args, **options):
+        StubTelegramHandler.fail_rate = options['fail_rate']
+        StubTelegramHandler.latency = options['latency']
+        StubTelegramHandler.received = 0
+        server = ThreadingHTTPServer(('127.0.0.1', 0), StubTelegramHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        base_url = f'http://127.0.0.1:{server.server_address[1]}'
+
+        queue = RedisDeliveryQueue() if options['redis'] else InMemoryDeliveryQueue()
+        worker = DeliveryWorker(
+            queue=queue,
+            sender=TelegramSender(base_url, pool_size=options['concurrency']),
+            global_rate=options['global_rate'],
+            per_chat_rate=options['per_chat_rate'],
+            batch_size=options['batch_size'],
+            concurrency=options['concurrency'],
+            retry_base=0.1,
+        )
+
+        queue.push(
+            build_message(i % options['chats'], f'Сообщение {i}')
+            for i in range(options['messages'])
+        )
+
+        totals = {'delivered': 0, 'retried': 0, 'failed': 0, 'throttled': 0, 'batches': 0}
+        started = time.monotonic()
+        while queue.size():
+            metrics = worker.drain(time_budget=60)
+            for key in totals:
+                totals[key] += metrics[key]
+            if not metrics['batches']:
+                time.sleep(0.05)
+        elapsed = time.monotonic() - started
+        server.shutdown()
+
+        self.stdout.write(
+            f"{totals['delivered']} delivered ({StubTelegramHandler.received} received by stub), "
+            f"{totals['failed']} failed, {totals['retried']} retries, "
+            f"{totals['throttled']} throttled, {totals['batches']} batches "
+            f"in {elapsed:.2f}s: {totals['delivered'] / elapsed:.0f} msg/s"
+        )
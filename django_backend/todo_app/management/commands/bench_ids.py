@@ -0,0 +1,78 @@
+"""
+Команда для сравнения схем генерации первичных ключей.
+"""
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from todo_app.ids import SnowflakeIdGenerator, legacy_md5_id
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает скорость вставки и размер PK-индекса для старых и новых ID'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=200000, help='Количество строк')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Размер пачки INSERT')
+
+    def handle(self, *args, **options):
+        schemes = [
+            ('md5', legacy_md5_id),
+            ('snowflake', SnowflakeIdGenerator().next_id),
+        ]
+        for name, generate in schemes:
+            result = self._run(name, generate, options['rows'], options['batch_size'])
+            self.stdout.write(
+                f"{name:>10}: {result['rows_per_sec']:.0f} rows/s, "
+                f"duplicates={result['duplicates']}, "
+                f"index={self._format_size(result['index_bytes'])}"
+            )
+
+    def _run(self, name, generate, rows, batch_size):
+        """Вставляет rows строк во временную таблицу и измеряет результат."""
+        table = f'bench_ids_{name}'
+        elapsed = 0.0
+
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f'DROP TABLE IF EXISTS {table}')
+            cursor.execute(
+                f'CREATE TEMPORARY TABLE {table} '
+                f'(id varchar(12) PRIMARY KEY, title varchar(200) NOT NULL)'
+            )
+
+            inserted = 0
+            while inserted < rows:
+                size = min(batch_size, rows - inserted)
+                batch = [(generate(), f'task {inserted + i}') for i in range(size)]
+
+                started = time.perf_counter()
+                if connection.vendor == 'postgresql':
+                    sql = f'INSERT INTO {table} (id, title) VALUES (%s, %s) ON CONFLICT DO NOTHING'
+                else:
+                    sql = f'INSERT OR IGNORE INTO {table} (id, title) VALUES (%s, %s)'
+                cursor.executemany(sql, batch)
+                elapsed += time.perf_counter() - started
+                inserted += size
+
+            # Коллизии молча отбрасываются ON CONFLICT, их видно по разнице
+            cursor.execute(f'SELECT COUNT(*) FROM {table}')
+            duplicates = rows - cursor.fetchone()[0]
+
+            index_bytes = None
+            if connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_relation_size(%s::regclass)', [f'{table}_pkey'])
+                index_bytes = cursor.fetchone()[0]
+
+            cursor.execute(f'DROP TABLE {table}')
+
+        return {
+            'rows_per_sec': rows / elapsed if elapsed else 0,
+            'duplicates': duplicates,
+            'index_bytes': index_bytes,
+        }
+
+    @staticmethod
+    def _format_size(size):
+        if size is None:
+            return 'n/a'
+        return f'{size / 1024 / 1024:.1f} MiB'
@@ -0,0 +1,96 @@
+"""
+Команда для сравнения JSON рендереров и парсеров на ответах API задач.
+"""
+import io
+import json
+import time
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from todo_app.models import Category, Task
+from todo_app.renderers import ORJSONParser, ORJSONRenderer
+from todo_app.serializers import TaskSerializer
+
+
+def _tasks(count):
+    """Несохраненные задачи с заполненными полями (без обращения к БД)."""
+    now = timezone.now()
+    user = User(id=1, username='tg_123456789')
+    category = Category(id=1, name='Работа')
+    statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+    return [
+        Task(
+            id=f'{i:012d}',
+            title=f'Задача {i}: подготовить отчет',
+            description='Собрать данные за неделю и отправить команде — «срочно»',
+            status=statuses[i % len(statuses)],
+            category=category if i % 2 else None,
+            user=user,
+            telegram_user_id=123456789,
+            due_date=now + timedelta(hours=i % 48 - 24) if i % 3 else None,
+            created_at=now - timedelta(minutes=i),
+            updated_at=now,
+        )
+        for i in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает JSONRenderer/JSONParser и их orjson-версии на типичных ответах'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=2000, help='Повторов на нагрузку')
+
+    def handle(self, *args, **options):
+        page = TaskSerializer(_tasks(20), many=True).data
+        payloads = [
+            ('task', TaskSerializer(_tasks(1)[0]).data),
+            ('page of 20', {'next': None, 'next_cursor': 'abc', 'results': page}),
+            ('list of 100', TaskSerializer(_tasks(100), many=True).data),
+            ('stats', {
+                'total': 42, 'pending': 10, 'in_progress': 5, 'completed': 25,
+                'cancelled': 2, 'overdue': 3, 'updated_at': timezone.now(),
+                'ratio': Decimal('0.595'), 'label': gettext_lazy('Задачи'),
+            }),
+        ]
+
+        iterations = options['iterations']
+        stock_renderer, fast_renderer = JSONRenderer(), ORJSONRenderer()
+        stock_parser, fast_parser = JSONParser(), ORJSONParser()
+
+        for name, data in payloads:
+            stock = stock_renderer.render(data)
+            fast = fast_renderer.render(data)
+            if json.loads(stock) != json.loads(fast):
+                raise CommandError(f'{name}: ORJSONRenderer отличается от JSONRenderer')
+
+            results = {
+                'render': [
+                    self._timed(lambda: stock_renderer.render(data), iterations),
+                    self._timed(lambda: fast_renderer.render(data), iterations),
+                ],
+                'parse': [
+                    self._timed(lambda: stock_parser.parse(io.BytesIO(stock)), iterations),
+                    self._timed(lambda: fast_parser.parse(io.BytesIO(stock)), iterations),
+                ],
+            }
+            for operation, (stock_time, fast_time) in results.items():
+                self.stdout.write(
+                    f'{name:>12} {operation:>6} ({len(stock):>6} B): '
+                    f'json {stock_time * 1e6:8.1f} us, orjson {fast_time * 1e6:8.1f} us, '
+                    f'saved {(stock_time - fast_time) * 1e6:8.1f} us ({stock_time / fast_time:.1f}x)'
+                )
+
+    @staticmethod
+    def _timed(run, iterations):
+        """Среднее время одного вызова, с."""
+        started = time.perf_counter()
+        for _ in range(iterations):
+            run()
+        return (time.perf_counter() - started) / iterations
@@ -0,0 +1,87 @@
+"""
+Команда для замера сериализации списков задач.
+"""
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from todo_app.models import Category, Task
+from todo_app.serializers import TaskRowSerializer, TaskSerializer
+
+
+class Command(BaseCommand):
+    help = 'Сравнивает TaskSerializer и TaskRowSerializer на списке задач (данные откатываются)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=10000, help='Количество задач')
+        parser.add_argument('--repeat', type=int, default=3, help='Повторов каждого варианта')
+        parser.add_argument(
+            '--fields', default='id,title,status',
+            help='Поля для варианта со sparse fieldset'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._create_tasks(options['tasks'])
+            queryset = Task.objects.select_related('category', 'user').filter(
+                telegram_user_id=0
+            )
+            fields = options['fields'].split(',')
+
+            full = TaskSerializer(queryset, many=True).data
+            if TaskRowSerializer().to_representation(TaskRowSerializer().queryset(queryset)) != full:
+                raise CommandError('TaskRowSerializer отличается от TaskSerializer')
+
+            # queryset.all() - каждый прогон заново выполняет запрос
+            variants = [
+                ('TaskSerializer', lambda: TaskSerializer(queryset.all(), many=True).data),
+                (f'TaskSerializer fields={options["fields"]}',
+                 lambda: TaskSerializer(queryset.all(), many=True, fields=fields).data),
+                ('TaskRowSerializer', lambda: self._rows(queryset.all(), None)),
+                (f'TaskRowSerializer fields={options["fields"]}',
+                 lambda: self._rows(queryset.all(), fields)),
+            ]
+            for name, run in variants:
+                best = min(self._timed(run) for _ in range(options['repeat']))
+                self.stdout.write(
+                    f'{name:>45}: {best * 1000:8.1f} ms, '
+                    f'{options["tasks"] / best:9.0f} tasks/s'
+                )
+
+            transaction.set_rollback(True)
+
+    @staticmethod
+    def _rows(queryset, fields):
+        rows = TaskRowSerializer(fields)
+        return rows.to_representation(rows.queryset(queryset))
+
+    @staticmethod
+    def _timed(run):
+        started = time.perf_counter()
+        run()
+        return time.perf_counter() - started
+
+    @staticmethod
+    def _create_tasks(count):
+        user = User.objects.create(username='bench_task_serialization')
+        category = Category.objects.create(name='bench_task_serialization')
+        now = timezone.now()
+        statuses = [choice for choice, _ in Task.STATUS_CHOICES]
+        Task.objects.bulk_create(
+            [
+                Task(
+                    title=f'Задача {i}',
+                    description='Описание задачи для замера сериализации',
+                    status=statuses[i % len(statuses)],
+                    category=category if i % 2 else None,
+                    user=user,
+                    telegram_user_id=0,
+                    due_date=now + timedelta(hours=i % 48 - 24) if i % 3 else None,
+                )
+                for i in range(count)
+            ],
+            batch_size=1000
+        )
@@ -0,0 +1,129 @@
+"""
+Команда для проверки планов горячих запросов к задачам.
+"""
+import json
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+from todo_app.models import Task
+
+TASK_TABLE = Task._meta.db_table
+
+
+def hot_queries():
+    """Запросы, которые должны обслуживаться индексами.
+
+    Возвращает [(название, queryset, требуется ли порядок из индекса)].
+    """
+    now = timezone.now()
+    user_id = 123456789
+    open_statuses = Task.OPEN_STATUSES
+    page = Task.objects.filter(telegram_user_id=user_id).order_by('-created_at', '-id')
+    queries = [
+        ('by_telegram_user', page[:21], True),
+        ('by_telegram_user?status', page.filter(status='pending')[:21], True),
+        ('by_telegram_user?cursor', page.filter(
+            Q(created_at__lt=now) | Q(created_at=now, id__lt='zzzzzzzzzzzz')
+        )[:21], True),
+        ('tasks?overdue=true', Task.objects.filter(
+            telegram_user_id=user_id, due_date__lt=now, status__in=open_statuses
+        ), False),
+        ('check_overdue_tasks', Task.objects.filter(
+            Q(last_notified_at__isnull=True) | Q(last_notified_at__lt=now - timedelta(hours=24)),
+            due_date__lt=now,
+            status__in=open_statuses,
+            telegram_user_id__isnull=False
+        ).order_by('telegram_user_id', 'due_date'), False),
+        ('rebuild_counters', Task.objects.filter(
+            telegram_user_id__in=[user_id, user_id + 1]
+        ).order_by().values('telegram_user_id', 'status').annotate(n=Count('id')), False),
+        ('task_cache_timeout', Task.objects.filter(
+            telegram_user_id=user_id, due_date__gt=now, status__in=open_statuses
+        ).order_by('due_date').values_list('due_date', flat=True)[:1], False),
+        ('overdue_counter', Task.objects.filter(
+            telegram_user_id=user_id, due_date__lt=now, status__in=open_statuses
+        ).order_by().values('telegram_user_id').annotate(n=Count('id')), False),
+    ]
+    if connection.vendor == 'postgresql':
+        # Колонка search_vector и trigram индекс есть только на PostgreSQL
+        from todo_app.search import FULLTEXT, TRIGRAM, filter_tasks
+        queries += [
+            ('tasks/search', filter_tasks(Task.objects.all(), 'молоко', FULLTEXT), False),
+            ('tasks/search?short', filter_tasks(Task.objects.all(), 'мол', TRIGRAM), False),
+        ]
+    return queries
+
+
+def _postgresql_problems(plan, ordered):
+    problems = []
+    uses_index = False
+
+    def walk(node):
+        nonlocal uses_index
+        if node.get('Relation Name') == TASK_TABLE:
+            if node['Node Type'] == 'Seq Scan':
+                problems.append('seq scan')
+            elif 'Index Name' in node:
+                uses_index = True
+        if ordered and node['Node Type'] in ('Sort', 'Incremental Sort'):
+            problems.append(node['Node Type'].lower())
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    if not uses_index:
+        problems.append('no index')
+    return problems
+
+
+def _sqlite_problems(plan, ordered):
+    problems = []
+    if any(f'SCAN {TASK_TABLE}' in line and 'USING' not in line for line in plan.splitlines()):
+        problems.append('full scan')
+    if 'USING' not in plan:
+        problems.append('no index')
+    if ordered and 'TEMP B-TREE FOR ORDER BY' in plan:
+        problems.append('sort')
+    return problems
+
+
+class Command(BaseCommand):
+    help = 'Проверяет через EXPLAIN, что горячие запросы к задачам используют индексы'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--verbose-plans', action='store_true', help='Печатать планы целиком')
+
+    def handle(self, *args, **options):
+        vendor = connection.vendor
+        if vendor not in ('postgresql', 'sqlite'):
+            raise CommandError(f'Проверка планов не поддерживается для {vendor}')
+
+        failures = []
+        with transaction.atomic():
+            if vendor == 'postgresql':
+                # На маленькой таблице планировщик честно выберет Seq Scan;
+                # без него видно, может ли запрос вообще использовать индекс
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+
+            for name, queryset, ordered in hot_queries():
+                if vendor == 'postgresql':
+                    raw = queryset.explain(format='json')
+                    problems = _postgresql_problems(json.loads(raw), ordered)
+                else:
+                    raw = queryset.explain()
+                    problems = _sqlite_problems(raw, ordered)
+
+                if problems:
+                    failures.append(name)
+                    self.stdout.write(self.style.ERROR(f'FAIL {name}: {", ".join(problems)}'))
+                else:
+                    self.stdout.write(self.style.SUCCESS(f'ok   {name}'))
+                if options['verbose_plans'] or problems:
+                    self.stdout.write(raw)
+
+        if failures:
+            raise CommandError(f'Запросы без индекса: {", ".join(failures)}')
@@ -0,0 +1,43 @@
+"""
+Команда для восстановления напоминаний о сроках задач.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from todo_app.models import Task
+from todo_app.reminders import get_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Заново планирует напоминания всех открытых задач со сроком в будущем'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--clear', action='store_true', help='Сначала очистить набор напоминаний')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Размер пачки ZADD')
+
+    def handle(self, *args, **options):
+        scheduler = get_scheduler()
+        if options['clear']:
+            scheduler.clear()
+
+        lead = timedelta(minutes=settings.REMINDER_LEAD_MINUTES)
+        tasks = Task.objects.filter(
+            status__in=Task.OPEN_STATUSES,
+            due_date__gt=timezone.now() + lead,
+            telegram_user_id__isnull=False
+        ).values_list('id', 'due_date').order_by()
+
+        scheduled = 0
+        chunk = {}
+        for task_id, due_date in tasks.iterator(chunk_size=options['chunk_size']):
+            chunk[task_id] = due_date - lead
+            if len(chunk) >= options['chunk_size']:
+                scheduled += scheduler.schedule_many(chunk)
+                chunk = {}
+        scheduled += scheduler.schedule_many(chunk)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Запланировано напоминаний: {scheduled} (всего в наборе: {scheduler.size()})')
+        )
@@ -0,0 +1,24 @@
+"""
+Команда для пересборки счетчиков задач пользователей.
+"""
+from django.core.management.base import BaseCommand
+from todo_app.counters import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересобирает материализованные счетчики задач с нуля'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--telegram-user-id',
+            type=int,
+            action='append',
+            dest='telegram_user_ids',
+            help='Пересобрать счетчики только для указанного пользователя (можно несколько раз)'
+        )
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_counters(options['telegram_user_ids'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересобрано счетчиков: {rebuilt}')
+        )
@@ -0,0 +1,23 @@
+"""
+Команда для просмотра попаданий в кэш ответов API.
+"""
+from django.core.management.base import BaseCommand
+from todo_app.response_cache import reset_response_cache_stats, response_cache_stats
+
+
+class Command(BaseCommand):
+    help = 'Показывает попадания и промахи кэша ответов API (процессы сбрасывают счетчики раз в 10 с)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Обнулить счетчики после вывода')
+
+    def handle(self, *args, **options):
+        for name, stats in response_cache_stats().items():
+            hit_rate = '-' if stats['hit_rate'] is None else f"{stats['hit_rate']:.1%}"
+            self.stdout.write(
+                f"{name}: hits {stats['hits']}, misses {stats['misses']}, hit rate {hit_rate}"
+            )
+
+        if options['reset']:
+            reset_response_cache_stats()
+            self.stdout.write(self.style.SUCCESS('Счетчики обнулены'))
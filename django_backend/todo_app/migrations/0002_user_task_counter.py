@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserTaskCounter',
+            fields=[
+                ('telegram_user_id', models.BigIntegerField(primary_key=True, serialize=False, verbose_name='Telegram ID')),
+                ('pending', models.IntegerField(default=0, verbose_name='В ожидании')),
+                ('in_progress', models.IntegerField(default=0, verbose_name='В процессе')),
+                ('completed', models.IntegerField(default=0, verbose_name='Завершено')),
+                ('cancelled', models.IntegerField(default=0, verbose_name='Отменено')),
+                ('overdue', models.IntegerField(default=0, verbose_name='Просрочено')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'Счетчики задач пользователя',
+                'verbose_name_plural': 'Счетчики задач пользователей',
+            },
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0003_category_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='task',
+            name='last_notified_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Последнее уведомление'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'in_progress'])), fields=['due_date', 'last_notified_at'], name='task_overdue_notify_idx'),
+        ),
+    ]
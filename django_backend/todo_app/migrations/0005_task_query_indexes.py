@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-18 04:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0004_task_last_notified_at'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['telegram_user_id', '-created_at', '-id'], name='task_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['telegram_user_id', 'status', '-created_at', '-id'], name='task_user_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(condition=models.Q(('status__in', ['pending', 'in_progress'])), fields=['telegram_user_id', 'due_date'], name='task_user_open_due_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='task',
+            name='todo_app_ta_telegra_eed795_idx',
+        ),
+    ]
@@ -0,0 +1,51 @@
+"""
+Полнотекстовый и trigram поиск задач (только PostgreSQL).
+
+Генерируемая колонка search_vector не описана в модели (Django 4.2 не
+поддерживает генерируемые поля), поэтому создается напрямую SQL.
+"""
+from django.db import migrations
+
+FORWARD_SQL = [
+    'CREATE EXTENSION IF NOT EXISTS pg_trgm',
+    """
+    ALTER TABLE todo_app_task ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B') ||
+        setweight(to_tsvector('english'::regconfig, coalesce(description, '')), 'B')
+    ) STORED
+    """,
+    'CREATE INDEX task_search_vector_idx ON todo_app_task USING gin (search_vector)',
+    'CREATE INDEX task_title_trgm_idx ON todo_app_task USING gin (title gin_trgm_ops)',
+]
+
+BACKWARD_SQL = [
+    'DROP INDEX IF EXISTS task_title_trgm_idx',
+    'DROP INDEX IF EXISTS task_search_vector_idx',
+    'ALTER TABLE todo_app_task DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _run_on_postgresql(statements):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for sql in statements:
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todo_app', '0005_task_query_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run_on_postgresql(FORWARD_SQL),
+            _run_on_postgresql(BACKWARD_SQL),
+        ),
+    ]
@@ -1,17 +1,14 @@
 """
 Модели для ToDo приложения.
 """
-import time
-import hashlib
 from django.db import models
 from django.contrib.auth.models import User
+from .ids import next_id
 
 
 def generate_custom_id():
-    """Генерирует кастомный ID на основе времени и хеша."""
-    timestamp = str(int(time.time() * 1000000))  # микросекунды
-    hash_obj = hashlib.md5(timestamp.encode())
-    return hash_obj.hexdigest()[:12]  # 12 символов
+    """Генерирует упорядоченный по времени ID из 12 символов (см. ids.py)."""
+    return next_id()
 
 
 class Category(models.Model):
@@ -26,6 +23,7 @@ class Category(models.Model):
     description = models.TextField(blank=True, verbose_name="Описание")
     color = models.CharField(max_length=7, default="#007bff", verbose_name="Цвет")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
     
     class Meta:
         verbose_name = "Категория"
@@ -53,6 +51,9 @@ class Task(models.Model):
         ('urgent', 'Срочный'),
     ]
     
+    # Статусы, в которых задача считается открытой (может быть просрочена)
+    OPEN_STATUSES = ('pending', 'in_progress')
+    
     id = models.CharField(
         max_length=12, 
         primary_key=True, 
@@ -100,6 +101,11 @@ class Task(models.Model):
         blank=True,
         verbose_name="Завершено"
     )
+    last_notified_at = models.DateTimeField(
+        null=True,
+        blank=True,
+        verbose_name="Последнее уведомление"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Создано")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
     
@@ -109,17 +115,88 @@ class Task(models.Model):
         ordering = ['-created_at']
         indexes = [
             models.Index(fields=['user', 'status']),
-            models.Index(fields=['telegram_user_id']),
             models.Index(fields=['due_date']),
+            # Список задач пользователя (by_telegram_user, keyset-пагинация):
+            # фильтр и сортировка обслуживаются индексом без Sort.
+            # Заменяет индекс по одному telegram_user_id
+            models.Index(
+                fields=['telegram_user_id', '-created_at', '-id'],
+                name='task_user_created_idx',
+            ),
+            # То же с фильтром по статусу; префикс (telegram_user_id, status)
+            # нужен и пересборке счетчиков
+            models.Index(
+                fields=['telegram_user_id', 'status', '-created_at', '-id'],
+                name='task_user_status_created_idx',
+            ),
+            # Просроченные задачи пользователя (?overdue=true, счетчики)
+            models.Index(
+                fields=['telegram_user_id', 'due_date'],
+                name='task_user_open_due_idx',
+                condition=models.Q(status__in=['pending', 'in_progress']),
+            ),
+            # Выборка check_overdue_tasks: только открытые задачи со сроком
+            models.Index(
+                fields=['due_date', 'last_notified_at'],
+                name='task_overdue_notify_idx',
+                condition=models.Q(status__in=['pending', 'in_progress']),
+            ),
         ]
     
     def __str__(self):
         return f"{self.title} ({self.get_status_display()})"
     
+    def save(self, *args, **kwargs):
+        """Сохраняет задачу, сбрасывая отметку уведомления при переносе срока.
+        
+        Исходный срок берется из снимка, который сохраняет обработчик
+        post_init (signals.remember_task_state), поэтому правило
+        действует для API, админки и прямых вызовов save().
+        """
+        if not self._state.adding and 'due_date' in self.__dict__:
+            old_due_date = getattr(self, '_reminder_state', (None, None, None))[2]
+            if self.due_date != old_due_date and self.last_notified_at is not None:
+                self.last_notified_at = None
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None and 'due_date' in update_fields:
+                    kwargs['update_fields'] = {*update_fields, 'last_notified_at'}
+        super().save(*args, **kwargs)
+    
     @property
     def is_overdue(self):
         """Проверяет, просрочена ли задача."""
         if not self.due_date or self.status == 'completed':
             return False
         from django.utils import timezone
-        return timezone.now() > self.due_date
\ No newline at end of file
+        return timezone.now() > self.due_date
+
+
+class UserTaskCounter(models.Model):
+    """Материализованные счетчики задач пользователя Telegram.
+    
+    Поддерживаются инкрементально (см. todo_app.counters), чтобы stats
+    отвечал одним чтением по первичному ключу.
+    """
+    telegram_user_id = models.BigIntegerField(primary_key=True, verbose_name="Telegram ID")
+    pending = models.IntegerField(default=0, verbose_name="В ожидании")
+    in_progress = models.IntegerField(default=0, verbose_name="В процессе")
+    completed = models.IntegerField(default=0, verbose_name="Завершено")
+    cancelled = models.IntegerField(default=0, verbose_name="Отменено")
+    overdue = models.IntegerField(default=0, verbose_name="Просрочено")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Обновлено")
+    
+    class Meta:
+        verbose_name = "Счетчики задач пользователя"
+        verbose_name_plural = "Счетчики задач пользователей"
+    
+    def __str__(self):
+        return f"Счетчики {self.telegram_user_id}"
+    
+    def as_stats(self):
+        """Возвращает счетчики в формате ответа stats."""
+        stats = {'total': 0}
+        for status_value, _ in Task.STATUS_CHOICES:
+            stats[status_value] = getattr(self, status_value)
+            stats['total'] += stats[status_value]
+        stats['overdue'] = self.overdue
+        return stats
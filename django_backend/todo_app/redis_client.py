@@ -0,0 +1,17 @@
+"""
+Общие подключения к Redis для фоновых подсистем.
+"""
+import threading
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_redis(url):
+    """Возвращает клиент Redis с общим пулом соединений для url."""
+    with _lock:
+        client = _clients.get(url)
+        if client is None:
+            import redis
+            client = _clients[url] = redis.Redis.from_url(url)
+        return client
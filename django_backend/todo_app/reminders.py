@@ -0,0 +1,136 @@
+"""
+Планировщик напоминаний о сроках задач.
+
+Напоминания хранятся в sorted set Redis: член - id задачи, score -
+время срабатывания (unix time). Повторное планирование той же задачи
+перезаписывает score, отмена - ZREM; обе операции O(log n), поэтому
+миллионы ожидающих напоминаний не занимают память воркеров Celery,
+как задачи с eta. Задача dispatch_due_reminders забирает наступившие
+напоминания пачками Lua скриптом, атомарно: при нескольких воркерах
+одно напоминание не отправляется дважды.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+REMINDERS_KEY = 'todo:reminders'
+
+
+class ReminderScheduler:
+    """Sorted set напоминаний: id задачи -> время срабатывания."""
+
+    # Атомарно забирает до ARGV[2] напоминаний со временем <= ARGV[1]
+    POP_SCRIPT = """
+    local due = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+    for _, item in ipairs(due) do
+        redis.call('ZREM', KEYS[1], item)
+    end
+    return due
+    """
+
+    def __init__(self, client=None):
+        self.redis = client or get_redis(settings.REMINDERS_REDIS_URL)
+        self._pop = self.redis.register_script(self.POP_SCRIPT)
+
+    def schedule_many(self, reminders):
+        """Планирует или переносит напоминания {task_id: datetime}."""
+        if reminders:
+            self.redis.zadd(
+                REMINDERS_KEY,
+                {task_id: when.timestamp() for task_id, when in reminders.items()}
+            )
+        return len(reminders)
+
+    def cancel_many(self, task_ids):
+        task_ids = list(task_ids)
+        if task_ids:
+            self.redis.zrem(REMINDERS_KEY, *task_ids)
+        return len(task_ids)
+
+    def pop_due(self, count, now=None):
+        """Забирает наступившие напоминания, возвращает id задач."""
+        now = time.time() if now is None else now
+        return [
+            item.decode() if isinstance(item, bytes) else item
+            for item in self._pop(keys=[REMINDERS_KEY], args=[now, count])
+        ]
+
+    def size(self):
+        return self.redis.zcard(REMINDERS_KEY)
+
+    def clear(self):
+        self.redis.delete(REMINDERS_KEY)
+
+
+_scheduler = None
+_init_lock = threading.Lock()
+
+
+def get_scheduler():
+    """Планировщик процесса (одно подключение к Redis на процесс)."""
+    global _scheduler
+    with _init_lock:
+        if _scheduler is None:
+            _scheduler = ReminderScheduler()
+        return _scheduler
+
+
+def reminder_time(task):
+    """Время напоминания о задаче или None, если напоминать не нужно."""
+    if task.status not in task.OPEN_STATUSES or not task.due_date or not task.telegram_user_id:
+        return None
+    return task.due_date - timedelta(minutes=settings.REMINDER_LEAD_MINUTES)
+
+
+def _apply(scheduled, cancelled):
+    # Ошибка Redis не должна ломать запись задачи: просроченные задачи
+    # все равно найдет check_overdue_tasks, а набор восстанавливает
+    # команда rebuild_reminders
+    try:
+        scheduler = get_scheduler()
+        scheduler.schedule_many(scheduled)
+        scheduler.cancel_many(cancelled)
+    except Exception as e:
+        logger.warning(f"Reminder scheduler unavailable: {e}")
+
+
+def sync_reminders(tasks, created=False):
+    """Планирует, переносит или отменяет напоминания задач.
+
+    Для только что созданных задач (created=True) отменять нечего.
+    Изменения уходят в Redis после фиксации текущей транзакции, чтобы
+    откат не оставил напоминание о несохраненном сроке.
+    """
+    now = timezone.now()
+    scheduled = {}
+    cancelled = []
+    for task in tasks:
+        when = reminder_time(task)
+        if when is not None and when > now:
+            scheduled[task.pk] = when
+        elif not created:
+            # Напоминание не нужно или срок уже прошел (им займется check_overdue_tasks)
+            cancelled.append(task.pk)
+    if scheduled or cancelled:
+        transaction.on_commit(lambda: _apply(scheduled, cancelled))
+
+
+def cancel_reminders(task_ids):
+    """Отменяет напоминания задач после фиксации транзакции."""
+    task_ids = list(task_ids)
+    if task_ids:
+        transaction.on_commit(lambda: _apply({}, task_ids))
+
+
+def schedule_reminder(task_id, when):
+    """Планирует напоминание о задаче на произвольное время."""
+    transaction.on_commit(lambda: _apply({task_id: when}, []))
@@ -0,0 +1,97 @@
+"""
+JSON рендерер и парсер на orjson.
+
+Вывод совпадает со стандартными JSONRenderer/JSONParser DRF: типы,
+которые orjson не знает (Decimal, ленивые строки, timedelta, QuerySet
+и т.д.), и все datetime кодируются тем же JSONEncoder.default, что и в
+DRF. Стандартный рендерер используется и для того, что orjson
+кодирует иначе: при режимах, которых orjson не поддерживает (отступы,
+ensure_ascii, некомпактный вывод), для NaN и бесконечностей (orjson
+выводит null, JSONRenderer при STRICT_JSON бросает ValueError), для
+целых вне 64 бит и вложенности глубже 255 уровней (orjson бросает
+JSONEncodeError). Dataclass тоже отдается в JSONEncoder.default;
+Enum orjson кодирует значением, а не ошибкой TypeError.
+
+Классы подключаются в settings.REST_FRAMEWORK автоматически, если
+orjson установлен.
+"""
+import math
+
+import orjson
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# datetime отдается в JSONEncoder.default ради DRF-формата ("Z" вместо
+# "+00:00" для любого нулевого смещения), ключи-не-строки как в json
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME
+    | orjson.OPT_PASSTHROUGH_DATACLASS
+    | orjson.OPT_NON_STR_KEYS
+)
+
+_default = JSONEncoder().default
+
+
+def _has_non_finite(data):
+    """Есть ли в словарях и списках data NaN или бесконечность.
+
+    Обход - самая дорогая часть рендеринга после orjson.dumps, поэтому
+    частые скалярные типы пропускаются первыми.
+    """
+    containers = [(data,)]
+    for container in containers:
+        for value in (container.values() if isinstance(container, dict) else container):
+            cls = type(value)
+            if cls is str or value is None or cls is int or cls is bool:
+                continue
+            if cls is float:
+                if not math.isfinite(value):
+                    return True
+            elif isinstance(value, (dict, list, tuple)):
+                containers.append(value)
+    return False
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer на orjson."""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+        if self.strict and _has_non_finite(data):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=_default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Целые вне 64 бит, глубокая вложенность и ошибки default:
+            # стандартный рендерер закодирует данные или бросит свою ошибку
+            return super().render(data, accepted_media_type, renderer_context)
+        # Как JSONRenderer: U+2028/U+2029 экранируются для совместимости с JavaScript
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
+
+class ORJSONParser(JSONParser):
+    """JSONParser на orjson."""
+    renderer_class = ORJSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        try:
+            raw = stream.read()
+            if encoding.lower().replace('-', '') != 'utf8':
+                raw = raw.decode(encoding)
+            return orjson.loads(raw)
+        except (ValueError, UnicodeDecodeError) as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
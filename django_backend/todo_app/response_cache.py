@@ -0,0 +1,239 @@
+"""
+Кэш ответов API с версионированием.
+
+Ответы кэшируются в кэше Django (Redis) под ключом, в который входит
+версия пространства имен ('categories', 'tasks:<telegram_user_id>'
+и т.п.). Запись в модель увеличивает версию (см. signals.py и массовые
+операции в views.py и admin.py), и все старые ключи сразу перестают
+читаться; сами записи удаляет Redis по таймауту. Начальная версия -
+текущее время в миллисекундах, поэтому потеря ключа версии не может
+вернуть к жизни старые записи.
+
+В кэше хранятся данные ответа до рендеринга и его ETag: попадание -
+это два запроса к Redis (версии и запись) без запросов к БД и без
+сериализации. Попадания и
+промахи считаются в памяти процесса и периодически сбрасываются в общие
+счетчики (см. response_cache_stats).
+"""
+import hashlib
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework import status
+from rest_framework.response import Response
+
+from .conditional import etag_matches
+
+logger = logging.getLogger(__name__)
+
+VERSION_KEY = 'resp_version:{}'
+ENTRY_KEY = 'resp:{}:{}:{}'
+METRIC_KEY = 'resp_stats:{}:{}'
+
+# Имена метрик, которые показывает response_cache_stats
+METRIC_NAMES = ('categories', 'tasks', 'stats', 'dashboard')
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def get_versions(namespaces):
+    """Текущие версии пространств имен одним запросом к кэшу.
+
+    Отсутствующие версии создаются при первом обращении.
+    """
+    keys = {namespace: VERSION_KEY.format(namespace) for namespace in namespaces}
+    found = cache.get_many(list(keys.values()))
+    versions = {}
+    for namespace, key in keys.items():
+        if key not in found:
+            cache.add(key, _now_ms(), timeout=None)
+            found[key] = cache.get(key)
+        versions[namespace] = found[key]
+    return versions
+
+
+def current_versions(namespaces):
+    """Версии для ETag; None, если кэш недоступен."""
+    try:
+        return get_versions(namespaces)
+    except Exception as e:
+        logger.warning(f"Response cache unavailable: {e}")
+        return dict.fromkeys(namespaces)
+
+
+def _bump(namespaces):
+    for namespace in namespaces:
+        key = VERSION_KEY.format(namespace)
+        try:
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, _now_ms(), timeout=None)
+        except Exception as e:
+            logger.warning(f"Response cache version bump failed for {namespace}: {e}")
+
+
+def bump_versions(namespaces):
+    """Инвалидирует пространства имен после фиксации текущей транзакции."""
+    namespaces = set(namespaces)
+    if namespaces:
+        transaction.on_commit(lambda: _bump(namespaces))
+
+
+def task_list_namespace(telegram_user_id):
+    """Пространство имен списков и статистики задач пользователя."""
+    return f'tasks:{telegram_user_id}'
+
+
+def invalidate_task_lists(telegram_user_ids):
+    """Сбрасывает кэш списков и статистики задач пользователей."""
+    bump_versions(
+        task_list_namespace(telegram_user_id)
+        for telegram_user_id in telegram_user_ids
+        if telegram_user_id is not None
+    )
+
+
+class _HitCounter:
+    """Счетчики попаданий процесса, раз в FLUSH_INTERVAL секунд - в Redis."""
+    FLUSH_INTERVAL = 10
+
+    def __init__(self):
+        self._counts = defaultdict(lambda: [0, 0])
+        self._flushed_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def record(self, name, hit):
+        with self._lock:
+            self._counts[name][0 if hit else 1] += 1
+            if time.monotonic() - self._flushed_at < self.FLUSH_INTERVAL:
+                return
+            counts, self._counts = self._counts, defaultdict(lambda: [0, 0])
+            self._flushed_at = time.monotonic()
+        self._flush(counts)
+
+    @staticmethod
+    def _flush(counts):
+        for name, values in counts.items():
+            for kind, delta in zip(('hits', 'misses'), values):
+                if not delta:
+                    continue
+                key = METRIC_KEY.format(name, kind)
+                try:
+                    if not cache.add(key, delta, timeout=None):
+                        cache.incr(key, delta)
+                except Exception as e:
+                    logger.warning(f"Response cache metrics unavailable: {e}")
+                    return
+
+
+hit_counter = _HitCounter()
+
+
+def response_cache_stats(names=METRIC_NAMES):
+    """Возвращает {имя: {'hits', 'misses', 'hit_rate'}} по всем процессам."""
+    keys = {
+        (name, kind): METRIC_KEY.format(name, kind)
+        for name in names for kind in ('hits', 'misses')
+    }
+    values = cache.get_many(list(keys.values()))
+    stats = {}
+    for name in names:
+        hits = values.get(keys[name, 'hits'], 0)
+        misses = values.get(keys[name, 'misses'], 0)
+        total = hits + misses
+        stats[name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def reset_response_cache_stats(names=METRIC_NAMES):
+    cache.delete_many([METRIC_KEY.format(name, kind) for name in names for kind in ('hits', 'misses')])
+
+
+class CachedResponseMixin:
+    """Кэширует ответы list и retrieve под версией cache_namespace.
+
+    Ставится перед ConditionalGetMixin: при попадании ETag берется из
+    кэша, и 304 отдается без обращения к БД. Ответ помечается
+    заголовком X-Cache: HIT или MISS. В ключ входят и версии
+    etag_namespaces - пространств имен, от которых зависит ответ.
+    """
+    cache_namespace = None
+    cache_metrics_name = None
+
+    def get_cache_namespace(self):
+        """Пространство имен ответа или None, если ответ не кэшируется."""
+        return self.cache_namespace
+
+    def get_cache_metrics_name(self, namespace):
+        return self.cache_metrics_name or namespace
+
+    def get_cache_timeout(self):
+        """Время жизни записи, с (вызывается после построения ответа)."""
+        return settings.RESPONSE_CACHE_TIMEOUT
+
+    def _cache_key(self, namespace):
+        dependencies = getattr(self, 'etag_namespaces', ())
+        versions = get_versions([namespace, *dependencies])
+        parts = [self.request.get_full_path()]
+        parts.extend(f'{name}={versions[name]}' for name in dependencies)
+        digest = hashlib.sha1('|'.join(parts).encode()).hexdigest()
+        return ENTRY_KEY.format(namespace, versions[namespace], digest)
+
+    def cached_response(self, build_response):
+        """Возвращает ответ из кэша или строит его через build_response()."""
+        namespace = self.get_cache_namespace()
+        if namespace is None:
+            return build_response()
+        metrics_name = self.get_cache_metrics_name(namespace)
+
+        try:
+            key = self._cache_key(namespace)
+            entry = cache.get(key)
+        except Exception as e:
+            logger.warning(f"Response cache unavailable: {e}")
+            return build_response()
+
+        if entry is not None:
+            hit_counter.record(metrics_name, hit=True)
+            etag, data = entry
+            headers = {'X-Cache': 'HIT'}
+            if etag:
+                headers['ETag'] = etag
+                if etag_matches(self.request.META.get('HTTP_IF_NONE_MATCH'), etag):
+                    return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+            return Response(data, headers=headers)
+
+        hit_counter.record(metrics_name, hit=False)
+        response = build_response()
+        if response.status_code == status.HTTP_200_OK:
+            try:
+                cache.set(
+                    key, (response.get('ETag'), response.data),
+                    timeout=self.get_cache_timeout()
+                )
+            except Exception as e:
+                logger.warning(f"Response cache unavailable: {e}")
+        response['X-Cache'] = 'MISS'
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(
+            lambda: super(CachedResponseMixin, self).list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            lambda: super(CachedResponseMixin, self).retrieve(request, *args, **kwargs)
+        )
@@ -0,0 +1,147 @@
+"""
+Полнотекстовый поиск задач.
+
+На PostgreSQL заголовок и описание индексируются в генерируемой
+колонке search_vector (конфигурации russian и english, заголовок с
+весом A, описание с весом B) с GIN индексом. Колонку создает миграция
+0006 в обход модели: Django 4.2 не поддерживает генерируемые поля, а
+обычное поле ORM пыталось бы записывать в нее при INSERT/UPDATE.
+
+Запрос превращается в префиксный tsquery (каждое слово - "слово:*"),
+результаты сортируются по ts_rank, фрагменты с подсветкой строит
+ts_headline. Короткие запросы (и запросы, не давшие результата, например
+из одних стоп-слов) ищутся по подстроке заголовка через trigram GIN
+индекс. На других СУБД используется icontains.
+"""
+import re
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchHeadline, SearchQuery, SearchRank, SearchVectorField, TrigramSimilarity
+)
+from django.db import connection
+from django.db.models import BooleanField, F, FloatField, Func, Q, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Concat
+from rest_framework.filters import SearchFilter
+
+from .models import Task
+
+SEARCH_CONFIGS = ('russian', 'english')
+
+FULLTEXT = 'fulltext'
+TRIGRAM = 'trigram'
+SUBSTRING = 'substring'
+
+_TOKEN_RE = re.compile(r'\w+')
+
+
+class _Matches(Func):
+    """tsvector @@ tsquery."""
+    arg_joiner = ' @@ '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+class _ILike(Func):
+    """ILIKE, который (в отличие от icontains) обслуживает trigram индекс."""
+    arg_joiner = ' ILIKE '
+    template = '(%(expressions)s)'
+    output_field = BooleanField()
+
+
+def _search_vector():
+    return RawSQL(
+        f'{connection.ops.quote_name(Task._meta.db_table)}.search_vector', [],
+        output_field=SearchVectorField()
+    )
+
+
+def _tsquery(query):
+    """Префиксный tsquery для всех конфигураций или None, если слов нет."""
+    tokens = _TOKEN_RE.findall(query.lower())
+    if not tokens:
+        return None
+    raw = ' & '.join(f'{token}:*' for token in tokens)
+    combined = None
+    for config in SEARCH_CONFIGS:
+        part = SearchQuery(raw, config=config, search_type='raw')
+        combined = part if combined is None else combined | part
+    return combined
+
+
+def _like_pattern(query):
+    escaped = query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+def search_mode(query):
+    """Выбирает способ поиска для запроса."""
+    if connection.vendor != 'postgresql':
+        return SUBSTRING
+    if len(query) <= settings.SEARCH_TRIGRAM_MAX_LENGTH or _tsquery(query) is None:
+        return TRIGRAM
+    return FULLTEXT
+
+
+def filter_tasks(queryset, query, mode=None):
+    """Оставляет задачи, подходящие под запрос (без ранжирования)."""
+    mode = mode or search_mode(query)
+    if mode == FULLTEXT:
+        return queryset.filter(_Matches(_search_vector(), _tsquery(query)))
+    if mode == TRIGRAM:
+        return queryset.filter(_ILike(F('title'), Value(_like_pattern(query))))
+    return queryset.filter(Q(title__icontains=query) | Q(description__icontains=query))
+
+
+def search_tasks(queryset, query, limit):
+    """Ранжированный поиск задач.
+
+    Возвращает (режим, список задач) с атрибутами search_rank и
+    search_headline. Если полнотекстовый поиск ничего не нашел,
+    повторяет поиск по подстроке заголовка.
+    """
+    mode = search_mode(query)
+    results = list(_ranked(filter_tasks(queryset, query, mode), query, mode)[:limit])
+    if not results and mode == FULLTEXT:
+        mode = TRIGRAM
+        results = list(_ranked(filter_tasks(queryset, query, mode), query, mode)[:limit])
+    return mode, results
+
+
+def _ranked(queryset, query, mode):
+    if mode == FULLTEXT:
+        tsquery = _tsquery(query)
+        return queryset.annotate(
+            search_rank=SearchRank(_search_vector(), tsquery),
+            search_headline=SearchHeadline(
+                Concat('title', Value('. '), 'description', output_field=TextField()),
+                tsquery,
+                config=SEARCH_CONFIGS[0],
+                start_sel=settings.SEARCH_HIGHLIGHT_START,
+                stop_sel=settings.SEARCH_HIGHLIGHT_STOP,
+                max_words=25,
+                min_words=8,
+                max_fragments=2,
+                fragment_delimiter=' … ',
+            ),
+        ).order_by('-search_rank', '-created_at')
+    if mode == TRIGRAM:
+        return queryset.annotate(
+            search_rank=TrigramSimilarity('title', query),
+            search_headline=F('title'),
+        ).order_by('-search_rank', '-created_at')
+    return queryset.annotate(
+        search_rank=Value(0.0, output_field=FloatField()),
+        search_headline=F('title'),
+    ).order_by('-created_at')
+
+
+class TaskSearchFilter(SearchFilter):
+    """?search= через поисковые индексы вместо ILIKE по каждому полю."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        return filter_tasks(queryset, query)
@@ -2,8 +2,8 @@
 Сериализаторы для API ToDo приложения.
 """
 from rest_framework import serializers
-from django.contrib.auth.models import User
 from .models import Category, Task
+from .users import resolve_telegram_user
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -31,6 +31,13 @@ class TaskSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
     
+    def __init__(self, *args, fields=None, **kwargs):
+        """fields ограничивает набор полей ответа (sparse fieldset)."""
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+    
     def create(self, validated_data):
         """Создает новую задачу."""
         # Если статус завершен, устанавливаем время завершения
@@ -42,18 +49,113 @@ class TaskSerializer(serializers.ModelSerializer):
     
     def update(self, instance, validated_data):
         """Обновляет задачу."""
+        self.apply_completion(instance, validated_data)
+        return super().update(instance, validated_data)
+    
+    @staticmethod
+    def apply_completion(instance, validated_data):
+        """Выставляет completed_at при смене статуса.
+        
+        Используется и в update(), и в массовом обновлении, которое
+        сохраняет задачи через bulk_update в обход update().
+        """
+        if 'status' not in validated_data:
+            return
+        
         # Если статус изменился на завершен, устанавливаем время завершения
-        if (validated_data.get('status') == 'completed' and 
+        if (validated_data['status'] == 'completed' and 
             instance.status != 'completed'):
             from django.utils import timezone
             validated_data['completed_at'] = timezone.now()
         
         # Если статус изменился с завершенного, убираем время завершения
-        elif (validated_data.get('status') != 'completed' and 
+        elif (validated_data['status'] != 'completed' and 
               instance.status == 'completed'):
             validated_data['completed_at'] = None
+
+
+    @staticmethod
+    def apply_due_date_change(instance, validated_data):
+        """Сбрасывает отметку уведомления при переносе срока.
         
-        return super().update(instance, validated_data)
+        Задача с новым сроком снова попадет в check_overdue_tasks,
+        когда новый срок наступит. При save() это делает Task.save,
+        здесь - для массового обновления через bulk_update.
+        """
+        if ('due_date' in validated_data and
+                validated_data['due_date'] != instance.due_date):
+            validated_data['last_notified_at'] = None
+
+
+class TaskRowSerializer:
+    """Быстрая read-only сериализация списков задач.
+    
+    Строки читаются через values() - без создания моделей, сигналов
+    post_init и полей DRF - и собираются в словари вручную; текущее
+    время и часовой пояс берутся один раз на список. Формат ответа
+    совпадает с TaskSerializer.
+    """
+    # Поле ответа -> колонка values()
+    SOURCES = {
+        'category': 'category_id',
+        'category_name': 'category__name',
+        'user': 'user_id',
+        'user_username': 'user__username',
+    }
+    DATETIME_FIELDS = {'due_date', 'completed_at', 'created_at', 'updated_at'}
+    # Колонки, нужные keyset-пагинации
+    PAGINATION_COLUMNS = ('id', 'created_at')
+    
+    def __init__(self, fields=None):
+        self.fields = list(fields or TaskSerializer.Meta.fields)
+        columns = set(self.PAGINATION_COLUMNS)
+        for field in self.fields:
+            if field == 'is_overdue':
+                columns.update(('due_date', 'status'))
+            else:
+                columns.add(self.SOURCES.get(field, field))
+        self.columns = sorted(columns)
+    
+    def queryset(self, queryset):
+        """queryset словарей с колонками для выбранных полей."""
+        return queryset.values(*self.columns)
+    
+    def to_representation(self, rows):
+        from django.utils import timezone
+        now = timezone.now()
+        current_timezone = timezone.get_current_timezone()
+        
+        def datetime_value(value):
+            # Как serializers.DateTimeField: текущий пояс, UTC как Z
+            if value is None:
+                return None
+            value = value.astimezone(current_timezone).isoformat()
+            if value.endswith('+00:00'):
+                value = value[:-6] + 'Z'
+            return value
+        
+        plan = [
+            (field, self.SOURCES.get(field, field), field in self.DATETIME_FIELDS)
+            for field in self.fields
+        ]
+        data = []
+        for row in rows:
+            item = {}
+            for field, column, is_datetime in plan:
+                if '__' in column and row[column] is None:
+                    # TaskSerializer пропускает поля через пустую связь
+                    continue
+                if field == 'is_overdue':
+                    due_date = row['due_date']
+                    item[field] = bool(
+                        due_date and row['status'] != 'completed' and now > due_date
+                    )
+                elif is_datetime:
+                    item[field] = datetime_value(row[column])
+                else:
+                    item[field] = row[column]
+            data.append(item)
+        return data
 
 
 class TaskCreateSerializer(serializers.ModelSerializer):
@@ -65,17 +167,15 @@ class TaskCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         """Создает задачу с автоматическим созданием пользователя."""
+        return super().create(self.with_user(validated_data))
+    
+    @staticmethod
+    def with_user(validated_data):
+        """Добавляет в данные пользователя Django по telegram_user_id."""
         telegram_user_id = validated_data.get('telegram_user_id')
         
         if telegram_user_id:
-            # Пытаемся найти или создать пользователя по Telegram ID
-            user, created = User.objects.get_or_create(
-                username=f'tg_{telegram_user_id}',
-                defaults={
-                    'first_name': f'User_{telegram_user_id}',
-                    'is_active': True
-                }
-            )
-            validated_data['user'] = user
+            # Находим или создаем пользователя по Telegram ID (через кэш)
+            validated_data['user'] = resolve_telegram_user(telegram_user_id)
         
-        return super().create(validated_data)
\ No newline at end of file
+        return validated_data
@@ -0,0 +1,105 @@
+"""
+Обработчики сигналов моделей ToDo приложения.
+"""
+from django.contrib.auth.models import User
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .counters import apply_status_change, rebuild_counters
+from .models import Category, Task
+from .reminders import cancel_reminders, sync_reminders
+from .response_cache import bump_versions, invalidate_task_lists
+from .users import forget_telegram_user
+
+
+def _reminder_state(instance):
+    """Возвращает поля, от которых зависит напоминание о задаче."""
+    return (
+        instance.__dict__.get('telegram_user_id'),
+        instance.__dict__.get('status'),
+        instance.__dict__.get('due_date'),
+    )
+
+
+def _loaded_state(instance):
+    """Возвращает (telegram_user_id, status) без загрузки отложенных полей."""
+    return (
+        instance.__dict__.get('telegram_user_id'),
+        instance.__dict__.get('status'),
+    )
+
+
+@receiver(post_init, sender=Task)
+def remember_task_state(sender, instance, **kwargs):
+    """Запоминает исходное состояние задачи для обновления счетчиков."""
+    instance._counter_state = _loaded_state(instance)
+    instance._reminder_state = _reminder_state(instance)
+    instance._cached_user_id = instance.__dict__.get('telegram_user_id')
+
+
+@receiver(post_save, sender=Task)
+def update_counters_on_save(sender, instance, created, **kwargs):
+    """Обновляет счетчики пользователя при создании и изменении задачи."""
+    new_user_id, new_status = instance.telegram_user_id, instance.status
+    
+    if created:
+        apply_status_change(new_user_id, None, new_status)
+    else:
+        old_user_id, old_status = getattr(instance, '_counter_state', (None, None))
+        if old_status is None:
+            # Исходный статус неизвестен (отложенное поле) - пересчитываем
+            rebuild_counters([old_user_id, new_user_id])
+        elif old_user_id != new_user_id:
+            apply_status_change(old_user_id, old_status, None)
+            apply_status_change(new_user_id, None, new_status)
+        else:
+            apply_status_change(new_user_id, old_status, new_status)
+    
+    instance._counter_state = (new_user_id, new_status)
+
+
+@receiver(post_delete, sender=Task)
+def update_counters_on_delete(sender, instance, **kwargs):
+    """Уменьшает счетчики пользователя при удалении задачи."""
+    telegram_user_id, status = getattr(instance, '_counter_state', (None, None))
+    if status is None:
+        rebuild_counters([telegram_user_id])
+    else:
+        apply_status_change(telegram_user_id, status, None)
+
+
+@receiver(post_save, sender=Task)
+def reschedule_reminder_on_save(sender, instance, created, **kwargs):
+    """Переносит или отменяет напоминание при изменении срока или статуса."""
+    state = _reminder_state(instance)
+    if created or state != getattr(instance, '_reminder_state', None):
+        sync_reminders([instance], created=created)
+    instance._reminder_state = state
+
+
+@receiver(post_delete, sender=Task)
+def cancel_reminder_on_delete(sender, instance, **kwargs):
+    """Отменяет напоминание об удаленной задаче."""
+    cancel_reminders([instance.pk])
+
+
+@receiver(post_save, sender=Task)
+@receiver(post_delete, sender=Task)
+def invalidate_task_list_cache(sender, instance, **kwargs):
+    """Сбрасывает кэш списков и статистики владельца задачи (старого и нового)."""
+    invalidate_task_lists({getattr(instance, '_cached_user_id', None), instance.telegram_user_id})
+    instance._cached_user_id = instance.telegram_user_id
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def invalidate_category_cache(sender, instance, **kwargs):
+    """Сбрасывает кэш ответов категорий (в том числе после правок в админке)."""
+    bump_versions(['categories'])
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def forget_cached_telegram_user(sender, instance, **kwargs):
+    """Сбрасывает кэш Telegram ID -> User при изменении пользователя."""
+    forget_telegram_user(instance.username)
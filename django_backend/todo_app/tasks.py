@@ -4,114 +4,245 @@ Celery задачи для уведомлений о задачах.
 from celery import shared_task
 from django.utils import timezone
 from django.conf import settings
-import requests
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
 
+def _format_reminder_message(task):
+    """Формирует напоминание о наступлении срока задачи."""
+    return (
+        f"⏰ Напоминание о задаче!\n\n"
+        f"📝 {task.title}\n"
+        f"📅 Срок: {task.due_date.strftime('%d.%m.%Y %H:%M')}\n"
+        f"🏷️ Категория: {task.category.name if task.category else 'Без категории'}"
+    )
+
+
 @shared_task
-def send_task_notification(task_id):
-    """Отправляет уведомление о наступлении срока задачи."""
+def send_telegram_notification(telegram_user_id, message):
+    """Ставит уведомление в очередь доставки в Telegram."""
     try:
-        from .models import Task
+        from .delivery import enqueue_messages
         
-        task = Task.objects.get(id=task_id)
-        
-        # Проверяем, что задача еще не завершена
-        if task.status == 'completed':
-            logger.info(f"Task {task_id} already completed, skipping notification")
-            return
-        
-        # Отправляем уведомление в Telegram бот
-        if task.telegram_user_id:
-            send_telegram_notification.delay(
-                task.telegram_user_id,
-                f"⏰ Напоминание о задаче!\n\n"
-                f"📝 {task.title}\n"
-                f"📅 Срок: {task.due_date.strftime('%d.%m.%Y %H:%M')}\n"
-                f"🏷️ Категория: {task.category.name if task.category else 'Без категории'}"
-            )
-        
-        logger.info(f"Notification sent for task {task_id}")
+        enqueue_messages([(telegram_user_id, message)])
+        drain_delivery_queue.delay()
+        logger.info(f"Telegram notification queued for {telegram_user_id}")
         
     except Exception as e:
-        logger.error(f"Error sending task notification for {task_id}: {e}")
+        logger.error(f"Error queueing Telegram notification: {e}")
 
 
 @shared_task
-def send_telegram_notification(telegram_user_id, message):
-    """Отправляет уведомление в Telegram."""
+def drain_delivery_queue():
+    """Отправляет накопленные уведомления пачками с ограничением скорости."""
     try:
-        # URL для отправки сообщения через бота
-        bot_api_url = getattr(settings, 'TELEGRAM_BOT_API_URL', None)
-        
-        if not bot_api_url:
-            logger.warning("TELEGRAM_BOT_API_URL not configured")
-            return
-        
-        response = requests.post(
-            f"{bot_api_url}/send_notification",
-            json={
-                'user_id': telegram_user_id,
-                'message': message
-            },
-            timeout=10
-        )
+        from .delivery import drain
+        
+        return drain()
         
-        if response.status_code == 200:
-            logger.info(f"Telegram notification sent to {telegram_user_id}")
-        else:
-            logger.error(f"Failed to send Telegram notification: {response.status_code}")
-            
     except Exception as e:
-        logger.error(f"Error sending Telegram notification: {e}")
+        logger.error(f"Error draining delivery queue: {e}")
+
+
+def _format_overdue_message(tasks, total):
+    """Формирует одно сообщение о просроченных задачах пользователя."""
+    def describe(task):
+        return (
+            f"📝 {task.title}\n"
+            f"📅 Должна была быть выполнена: {task.due_date.strftime('%d.%m.%Y %H:%M')}\n"
+            f"🏷️ Категория: {task.category.name if task.category else 'Без категории'}"
+        )
+    
+    if total == 1:
+        return f"🚨 Задача просрочена!\n\n{describe(tasks[0])}"
+    
+    message = f"🚨 Просрочено задач: {total}\n\n" + "\n\n".join(describe(task) for task in tasks)
+    if total > len(tasks):
+        message += f"\n\n…и еще {total - len(tasks)}"
+    return message
 
 
 @shared_task
 def check_overdue_tasks():
-    """Проверяет просроченные задачи и отправляет уведомления."""
+    """Проверяет просроченные задачи и отправляет уведомления.
+    
+    Задачи читаются потоково (iterator) в порядке telegram_user_id, так
+    что в памяти находятся только задачи текущего пользователя и одна
+    пачка сообщений. Каждый пользователь получает одно сообщение со
+    всеми просроченными задачами, сообщения уходят в очередь доставки
+    пачками.
+    
+    Отправленные задачи помечаются last_notified_at и повторно попадают
+    в выборку только через OVERDUE_RENOTIFY_INTERVAL.
+    """
     try:
+        from datetime import timedelta
+        from django.db.models import Q
+        from .delivery import enqueue_messages
         from .models import Task
         
+        started = time.monotonic()
         now = timezone.now()
+        renotify_before = now - timedelta(
+            hours=getattr(settings, 'OVERDUE_RENOTIFY_INTERVAL', 24)
+        )
+        chunk_size = getattr(settings, 'OVERDUE_CHUNK_SIZE', 2000)
+        batch_size = getattr(settings, 'NOTIFICATION_BATCH_SIZE', 100)
+        max_tasks = getattr(settings, 'OVERDUE_NOTIFICATION_MAX_TASKS', 10)
         
         # Находим просроченные задачи, по которым еще не отправлялись уведомления
-        overdue_tasks = Task.objects.filter(
+        pending = Task.objects.filter(
+            Q(last_notified_at__isnull=True) | Q(last_notified_at__lt=renotify_before),
             due_date__lt=now,
-            status__in=['pending', 'in_progress']
+            status__in=Task.OPEN_STATUSES
         )
-        
-        for task in overdue_tasks:
-            if task.telegram_user_id:
-                send_telegram_notification.delay(
-                    task.telegram_user_id,
-                    f"🚨 Задача просрочена!\n\n"
-                    f"📝 {task.title}\n"
-                    f"📅 Должна была быть выполнена: {task.due_date.strftime('%d.%m.%Y %H:%M')}\n"
-                    f"🏷️ Категория: {task.category.name if task.category else 'Без категории'}"
+        overdue_tasks = pending.filter(telegram_user_id__isnull=False).select_related(
+            'category'
+        ).only(
+            'id', 'title', 'due_date', 'telegram_user_id', 'category__name'
+        ).order_by('telegram_user_id', 'due_date')
+        
+        metrics = {'tasks': 0, 'users': 0, 'batches': 0}
+        batch = []
+        current_user_id = None
+        user_tasks = []
+        user_total = 0
+        
+        def flush_user():
+            if user_total:
+                batch.append([current_user_id, _format_overdue_message(user_tasks, user_total)])
+                metrics['users'] += 1
+        
+        def flush_batch():
+            if batch:
+                enqueue_messages(batch)
+                # Помечаем после постановки в очередь: при сбое брокера
+                # задачи попадут в следующий запуск. Задачи выбираются тем
+                # же условием по пользователям пачки, а не списком ID:
+                # память и размер запроса не зависят от числа задач
+                pending.filter(
+                    telegram_user_id__in=[telegram_user_id for telegram_user_id, _ in batch]
+                ).update(last_notified_at=now)
+                metrics['batches'] += 1
+                batch.clear()
+        
+        for task in overdue_tasks.iterator(chunk_size=chunk_size):
+            if task.telegram_user_id != current_user_id:
+                flush_user()
+                if len(batch) >= batch_size:
+                    flush_batch()
+                current_user_id = task.telegram_user_id
+                user_tasks = []
+                user_total = 0
+            
+            user_total += 1
+            if len(user_tasks) < max_tasks:
+                user_tasks.append(task)
+            
+            metrics['tasks'] += 1
+            if metrics['tasks'] % chunk_size == 0:
+                logger.info(
+                    f"Overdue check progress: {metrics['tasks']} tasks, "
+                    f"{metrics['users']} users, {metrics['batches']} batches"
                 )
         
-        logger.info(f"Checked {overdue_tasks.count()} overdue tasks")
+        flush_user()
+        flush_batch()
+        if metrics['batches']:
+            drain_delivery_queue.delay()
+        
+        metrics['elapsed'] = round(time.monotonic() - started, 3)
+        logger.info(
+            f"Checked {metrics['tasks']} overdue tasks: notified {metrics['users']} users "
+            f"in {metrics['batches']} batches, {metrics['elapsed']}s"
+        )
+        return metrics
         
     except Exception as e:
         logger.error(f"Error checking overdue tasks: {e}")
 
 
 @shared_task
-def schedule_task_notification(task_id, notification_time):
-    """Планирует уведомление о задаче."""
+def refresh_overdue_counters():
+    """Обновляет количество просроченных задач в счетчиках пользователей."""
     try:
-        from celery import current_app
+        from .counters import refresh_overdue_counters as refresh
         
-        # Планируем задачу на определенное время
-        current_app.send_task(
-            'todo_app.tasks.send_task_notification',
-            args=[task_id],
-            eta=notification_time
-        )
+        updated = refresh()
+        logger.info(f"Refreshed overdue counters for {updated} users")
         
-        logger.info(f"Scheduled notification for task {task_id} at {notification_time}")
+    except Exception as e:
+        logger.error(f"Error refreshing overdue counters: {e}")
+
+
+@shared_task
+def dispatch_due_reminders():
+    """Отправляет наступившие напоминания о сроках задач.
+    
+    Напоминания забираются из sorted set пачками по REMINDER_BATCH_SIZE,
+    задачи пачки читаются одним запросом. Завершенные и удаленные задачи
+    пропускаются, а задачи, срок которых успели перенести, планируются
+    заново.
+    """
+    try:
+        from .delivery import enqueue_messages
+        from .models import Task
+        from .reminders import get_scheduler, reminder_time
+        
+        scheduler = get_scheduler()
+        started = time.monotonic()
+        metrics = {'popped': 0, 'sent': 0, 'rescheduled': 0, 'skipped': 0, 'batches': 0}
+        
+        while time.monotonic() - started < settings.REMINDER_DISPATCH_SECONDS:
+            task_ids = scheduler.pop_due(settings.REMINDER_BATCH_SIZE)
+            if not task_ids:
+                break
+            metrics['popped'] += len(task_ids)
+            metrics['batches'] += 1
+            
+            now = timezone.now()
+            tasks = Task.objects.filter(pk__in=task_ids).select_related('category').only(
+                'id', 'title', 'status', 'due_date', 'telegram_user_id', 'category__name'
+            )
+            messages = []
+            sent_ids = []
+            later = {}
+            for task in tasks:
+                when = reminder_time(task)
+                if when is None:
+                    continue
+                if when > now:
+                    later[task.pk] = when
+                else:
+                    messages.append((task.telegram_user_id, _format_reminder_message(task)))
+                    sent_ids.append(task.pk)
+            
+            try:
+                enqueue_messages(messages)
+            except Exception:
+                # Возвращаем напоминания в набор, чтобы не потерять их
+                scheduler.schedule_many({pk: now for pk in sent_ids})
+                raise
+            scheduler.schedule_many(later)
+            
+            metrics['sent'] += len(messages)
+            metrics['rescheduled'] += len(later)
+            metrics['skipped'] += len(task_ids) - len(messages) - len(later)
+        
+        if metrics['sent']:
+            drain_delivery_queue.delay()
+        
+        metrics['elapsed'] = round(time.monotonic() - started, 3)
+        if metrics['batches']:
+            logger.info(
+                f"Reminders: {metrics['sent']} sent, {metrics['rescheduled']} rescheduled, "
+                f"{metrics['skipped']} skipped in {metrics['batches']} batches, "
+                f"{metrics['elapsed']}s"
+            )
+        return metrics
         
     except Exception as e:
-        logger.error(f"Error scheduling task notification: {e}")
\ No newline at end of file
+        logger.error(f"Error dispatching due reminders: {e}")
+
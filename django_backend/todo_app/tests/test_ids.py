@@ -0,0 +1,119 @@
+"""
+Тесты генератора ID: процессы, созданные fork, не должны выдавать
+одинаковые ID при одном и том же ID_WORKER_ID.
+"""
+import json
+import os
+import unittest
+from unittest import mock
+
+from django.conf import settings
+from django.test import SimpleTestCase, override_settings
+
+from todo_app import ids
+from todo_app.redis_client import get_redis
+
+IDS_PER_PROCESS = 2000
+
+
+def _redis_available():
+    if not settings.ID_WORKER_REDIS_URL:
+        return False
+    try:
+        return get_redis(settings.ID_WORKER_REDIS_URL).ping()
+    except Exception:
+        return False
+
+
+def _fork_minting(prepare):
+    """Запускает дочерний процесс, который выдает IDS_PER_PROCESS ID.
+
+    prepare вызывается в дочернем процессе и возвращает генератор -
+    как воркер gunicorn без --preload, который импортирует код после fork.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            os.close(read_fd)
+            generator = prepare()
+            minted = [generator.next_int() for _ in range(IDS_PER_PROCESS)]
+            with os.fdopen(write_fd, 'w') as pipe:
+                json.dump({'worker_id': generator.worker_id, 'ids': minted}, pipe)
+            code = 0
+        finally:
+            os._exit(code)
+    os.close(write_fd)
+    return pid, read_fd
+
+
+def _collect(pid, read_fd):
+    with os.fdopen(read_fd) as pipe:
+        data = pipe.read()
+    _, status = os.waitpid(pid, 0)
+    assert os.waitstatus_to_exitcode(status) == 0, 'child process failed'
+    return json.loads(data)
+
+
+@mock.patch.dict(os.environ, {'ID_WORKER_ID': '1'})
+class ForkedWorkerIdTests(SimpleTestCase):
+
+    def assertDisjoint(self, first, second):
+        self.assertNotEqual(first['worker_id'], second['worker_id'])
+        self.assertEqual(len(set(first['ids'])), IDS_PER_PROCESS)
+        self.assertEqual(len(set(second['ids'])), IDS_PER_PROCESS)
+        self.assertFalse(set(first['ids']) & set(second['ids']))
+
+    @unittest.skipUnless(_redis_available(), 'Redis для аренды номеров недоступен')
+    def test_forked_processes_lease_distinct_worker_ids(self):
+        children = [_fork_minting(ids.SnowflakeIdGenerator) for _ in range(2)]
+        results = [_collect(*child) for child in children]
+        # Дочерние процессы завершились через os._exit и аренду не сняли
+        client = get_redis(settings.ID_WORKER_REDIS_URL)
+        client.delete(*(ids.LEASE_KEY.format(r['worker_id']) for r in results))
+        self.assertDisjoint(*results)
+
+    @override_settings(ID_WORKER_REDIS_URL='')
+    def test_forked_pool_processes_get_distinct_worker_ids(self):
+        def prepare(index):
+            ids.set_process_index(index)
+            return ids.SnowflakeIdGenerator()
+
+        children = [_fork_minting(lambda i=i: prepare(i)) for i in range(2)]
+        self.assertDisjoint(*(_collect(*child) for child in children))
+
+    @override_settings(ID_WORKER_REDIS_URL='')
+    def test_inherited_generator_requires_pool_index(self):
+        generator = ids.SnowflakeIdGenerator()
+        generator.next_int()
+        pid, read_fd = _fork_minting(lambda: generator)
+        with os.fdopen(read_fd) as pipe:
+            self.assertEqual(pipe.read(), '')
+        _, status = os.waitpid(pid, 0)
+        self.assertNotEqual(os.waitstatus_to_exitcode(status), 0)
+
+
+@unittest.skipUnless(_redis_available(), 'Redis для аренды номеров недоступен')
+class WorkerIdLeaseTests(SimpleTestCase):
+
+    def setUp(self):
+        self.client = get_redis(settings.ID_WORKER_REDIS_URL)
+        self.lease = ids.WorkerIdLease(self.client, ttl=30, preferred=ids.MAX_WORKER_ID)
+        self.addCleanup(self.lease.release)
+
+    def test_acquire_skips_leased_ids(self):
+        other = ids.WorkerIdLease(self.client, ttl=30, preferred=ids.MAX_WORKER_ID)
+        self.addCleanup(other.release)
+        other.acquire()
+        self.assertNotEqual(self.lease.acquire(), other.worker_id)
+
+    def test_lost_lease_is_replaced(self):
+        lost_id = self.lease.acquire()
+        # Процесс простоял дольше TTL, и номер занял другой процесс
+        key = ids.LEASE_KEY.format(lost_id)
+        self.client.set(key, 'other', ex=30)
+        self.addCleanup(self.client.delete, key)
+        self.lease._refreshed_at -= self.lease.ttl
+        self.assertNotEqual(self.lease.current(), lost_id)
+        self.assertEqual(self.client.get(key), b'other')
@@ -0,0 +1,136 @@
+"""
+Тесты количества запросов и планов горячих запросов к задачам.
+
+Количество запросов не должно зависеть от числа задач: списки,
+статистика и проверка просроченных задач не делают запросов на
+каждую строку.
+"""
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from todo_app.counters import get_user_stats, rebuild_counters
+from todo_app.models import Category, Task
+from todo_app.tasks import check_overdue_tasks
+
+# Без кэша ответов каждый запрос к API доходит до БД
+DUMMY_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+
+
+@override_settings(CACHES=DUMMY_CACHES)
+class TaskQueryCountTests(TestCase):
+    """Число запросов горячих эндпоинтов для 3 и 40 задач одинаково."""
+    
+    SMALL_USER_ID = 700101
+    LARGE_USER_ID = 700102
+    
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='query_count')
+        category = Category.objects.create(name='Работа')
+        now = timezone.now()
+        for telegram_user_id, count in ((cls.SMALL_USER_ID, 3), (cls.LARGE_USER_ID, 40)):
+            Task.objects.bulk_create([
+                Task(
+                    title=f'Задача {i}',
+                    user=user,
+                    telegram_user_id=telegram_user_id,
+                    category=category,
+                    # Половина задач просрочена
+                    due_date=now + timedelta(hours=i - count // 2, minutes=30),
+                )
+                for i in range(count)
+            ])
+        rebuild_counters([cls.SMALL_USER_ID, cls.LARGE_USER_ID])
+    
+    def setUp(self):
+        self.client = APIClient()
+    
+    def assertQueriesPerUser(self, expected, path, params=None):
+        for telegram_user_id in (self.SMALL_USER_ID, self.LARGE_USER_ID):
+            with self.subTest(telegram_user_id=telegram_user_id):
+                with self.assertNumQueries(expected):
+                    response = self.client.get(
+                        path, {'telegram_user_id': telegram_user_id, **(params or {})}
+                    )
+                self.assertEqual(response.status_code, 200)
+    
+    def test_list(self):
+        # ETag (агрегат) и страница
+        self.assertQueriesPerUser(2, '/api/tasks/')
+    
+    def test_by_telegram_user(self):
+        # ETag, страница и ближайший срок для времени жизни кэша
+        self.assertQueriesPerUser(3, '/api/tasks/by_telegram_user/')
+    
+    def test_stats(self):
+        # Строка счетчиков, просроченные задачи и время жизни кэша
+        self.assertQueriesPerUser(3, '/api/tasks/stats/')
+    
+    def test_stats_group_by(self):
+        # Один GROUP BY и итог
+        self.assertQueriesPerUser(2, '/api/tasks/stats/', {'group_by': 'category'})
+    
+    def test_dashboard(self):
+        self.assertQueriesPerUser(6, '/api/tasks/dashboard/')
+    
+    def test_user_stats_counts_overdue_live(self):
+        stats = get_user_stats(self.LARGE_USER_ID)
+        self.assertEqual(stats['total'], 40)
+        self.assertEqual(stats['overdue'], 20)
+    
+    @override_settings(NOTIFICATION_BATCH_SIZE=100)
+    def test_check_overdue_tasks(self):
+        sent = []
+        # Пачка очищается после постановки в очередь - копируем ее
+        enqueue = mock.patch(
+            'todo_app.delivery.enqueue_messages',
+            side_effect=lambda batch: sent.extend(batch)
+        )
+        with enqueue, mock.patch('todo_app.tasks.drain_delivery_queue'):
+            # Выборка и одна отметка last_notified_at на пачку сообщений
+            with self.assertNumQueries(2):
+                metrics = check_overdue_tasks()
+        
+        self.assertEqual(metrics['tasks'], 21)
+        self.assertEqual(metrics['users'], 2)
+        self.assertEqual(sorted(chat_id for chat_id, _ in sent),
+                         [self.SMALL_USER_ID, self.LARGE_USER_ID])
+        
+        # Отмеченные задачи повторно не выбираются
+        with mock.patch('todo_app.delivery.enqueue_messages') as enqueue, \
+                mock.patch('todo_app.tasks.drain_delivery_queue'):
+            with self.assertNumQueries(1):
+                self.assertEqual(check_overdue_tasks()['tasks'], 0)
+        enqueue.assert_not_called()
+
+    
+    @override_settings(NOTIFICATION_BATCH_SIZE=1, OVERDUE_NOTIFICATION_MAX_TASKS=3)
+    def test_check_overdue_tasks_marks_by_user(self):
+        # Отметка идет по пользователям пачки: один UPDATE на пачку,
+        # сколько бы просроченных задач ни было у пользователя
+        with mock.patch('todo_app.delivery.enqueue_messages'), \
+                mock.patch('todo_app.tasks.drain_delivery_queue'):
+            with self.assertNumQueries(3):
+                metrics = check_overdue_tasks()
+        
+        self.assertEqual(metrics['batches'], 2)
+        self.assertFalse(Task.objects.filter(
+            due_date__lt=timezone.now(), status__in=Task.OPEN_STATUSES,
+            last_notified_at__isnull=True
+        ).exists())
+        # Задачи со сроком в будущем не отмечаются
+        self.assertTrue(Task.objects.filter(
+            due_date__gt=timezone.now(), last_notified_at__isnull=True
+        ).exists())
+
+class QueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        # CommandError, если какой-то запрос читает таблицу целиком
+        call_command('check_query_plans', stdout=StringIO())
@@ -0,0 +1,104 @@
+"""
+Тесты ORJSONRenderer: вывод должен совпадать со стандартным JSONRenderer.
+"""
+import dataclasses
+import unittest
+from datetime import timedelta
+from decimal import Decimal
+from importlib.util import find_spec
+
+from django.contrib.auth.models import User
+from django.test import TestCase
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+
+from todo_app.models import Category, Task
+from todo_app.serializers import CategorySerializer, TaskRowSerializer, TaskSerializer
+
+
+@unittest.skipUnless(find_spec('orjson'), 'orjson не установлен')
+class ORJSONRendererTests(TestCase):
+    
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create(username='renderer')
+        cls.category = Category.objects.create(name='Работа', description='«Кавычки» и разделитель')
+        now = timezone.now()
+        Task.objects.bulk_create([
+            Task(
+                title=f'Задача {i} — отчет',
+                description='' if i % 2 else 'Многострочное\nописание',
+                user=user,
+                telegram_user_id=123456789,
+                category=cls.category if i % 2 else None,
+                status=['pending', 'completed'][i % 2],
+                completed_at=now if i % 2 else None,
+                due_date=now + timedelta(hours=i - 2) if i % 3 else None,
+            )
+            for i in range(5)
+        ])
+    
+    def setUp(self):
+        from todo_app.renderers import ORJSONRenderer
+        self.stock = JSONRenderer()
+        self.fast = ORJSONRenderer()
+    
+    def assertSameOutput(self, make_data):
+        # make_data() вызывается для каждого рендерера: генераторы одноразовые
+        self.assertEqual(self.fast.render(make_data()), self.stock.render(make_data()))
+    
+    def assertSameError(self, make_data):
+        with self.assertRaises(Exception) as stock:
+            self.stock.render(make_data())
+        with self.assertRaises(type(stock.exception)):
+            self.fast.render(make_data())
+    
+    def test_serializers(self):
+        tasks = Task.objects.select_related('category', 'user')
+        rows = TaskRowSerializer()
+        cases = {
+            'task': lambda: TaskSerializer(tasks.first()).data,
+            'tasks': lambda: TaskSerializer(tasks, many=True).data,
+            'task rows': lambda: rows.to_representation(rows.queryset(tasks)),
+            'categories': lambda: CategorySerializer(Category.objects.all(), many=True).data,
+        }
+        for name, make_data in cases.items():
+            with self.subTest(name):
+                self.assertSameOutput(make_data)
+    
+    def test_extra_types(self):
+        @dataclasses.dataclass
+        class Point:
+            x: int
+        
+        def nested(depth):
+            value = []
+            for _ in range(depth):
+                value = [value]
+            return value
+        
+        cases = {
+            'generator': lambda: {'items': (i for i in range(3))},
+            'big int': lambda: {'id': 2 ** 70, 'negative': -2 ** 64},
+            'deep nesting': lambda: {'nested': nested(300)},
+            'decimal and lazy string': lambda: {
+                'ratio': Decimal('0.595'), 'label': gettext_lazy('Задачи'),
+            },
+            'durations and sets': lambda: {'delay': timedelta(minutes=5), 'ids': {1}},
+            'finite floats': lambda: {'ratio': 0.5, 'values': [1.0, -2.5e10]},
+        }
+        for name, make_data in cases.items():
+            with self.subTest(name):
+                self.assertSameOutput(make_data)
+        
+        errors = {
+            'nan': lambda: {'ratio': float('nan')},
+            'nested inf': lambda: [{'values': (1.0, float('inf'))}],
+            'bare -inf': lambda: float('-inf'),
+            'dataclass': lambda: Point(1),
+            'unknown type': lambda: {'value': object()},
+        }
+        for name, make_data in errors.items():
+            with self.subTest(name):
+                self.assertSameError(make_data)
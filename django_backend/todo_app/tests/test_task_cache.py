@@ -0,0 +1,132 @@
+"""
+Тесты инвалидации кэша списков, статистики и dashboard задач.
+"""
+from django.contrib import admin
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.core.cache import cache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from todo_app.models import Category, Task
+from todo_app.users import forget_telegram_user, telegram_username
+
+LOCMEM_CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHES)
+class TaskCacheInvalidationTests(TestCase):
+    """Каждый путь записи задач должен сбрасывать кэш пользователя."""
+    
+    telegram_user_id = 700001
+    CACHED_ACTIONS = ('by_telegram_user', 'stats', 'dashboard')
+    
+    def setUp(self):
+        cache.clear()
+        # Пользователь из кэша процесса остался от откаченного теста
+        forget_telegram_user(telegram_username(self.telegram_user_id))
+        self.client = APIClient()
+        self.category = Category.objects.create(name='Работа')
+        self.task_id = self._write('post', '/api/tasks/create_for_telegram/', {
+            'title': 'Первая',
+            'telegram_user_id': self.telegram_user_id,
+            'category': self.category.pk,
+        })['id']
+    
+    def _get(self, action):
+        return self.client.get(
+            f'/api/tasks/{action}/', {'telegram_user_id': self.telegram_user_id}
+        )
+    
+    def _write(self, method, path, data):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = getattr(self.client, method)(path, data, format='json')
+        self.assertLess(response.status_code, 400, response.content)
+        return response.json()
+    
+    def _task(self):
+        return Task.objects.get(pk=self.task_id)
+    
+    def assertInvalidates(self, write):
+        """Прогревает кэш, выполняет запись и проверяет промахи после нее."""
+        before = {}
+        for action in self.CACHED_ACTIONS:
+            self._get(action)
+            response = self._get(action)
+            self.assertEqual(response['X-Cache'], 'HIT', action)
+            before[action] = response.json()
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            write()
+        
+        for action in self.CACHED_ACTIONS:
+            response = self._get(action)
+            self.assertEqual(response['X-Cache'], 'MISS', action)
+        self.assertNotEqual(self._get('by_telegram_user').json(), before['by_telegram_user'])
+    
+    def test_hit_does_not_query_database(self):
+        for action in self.CACHED_ACTIONS:
+            self._get(action)
+            with self.assertNumQueries(0):
+                self.assertEqual(self._get(action)['X-Cache'], 'HIT')
+    
+    def test_create_for_telegram(self):
+        self.assertInvalidates(lambda: self._write('post', '/api/tasks/create_for_telegram/', {
+            'title': 'Вторая', 'telegram_user_id': self.telegram_user_id
+        }))
+    
+    def test_bulk_create_for_telegram(self):
+        self.assertInvalidates(lambda: self._write('post', '/api/tasks/bulk_create_for_telegram/', {
+            'tasks': [
+                {'title': f'Пачка {i}', 'telegram_user_id': self.telegram_user_id}
+                for i in range(3)
+            ]
+        }))
+    
+    def test_partial_update(self):
+        self.assertInvalidates(lambda: self._write(
+            'patch', f'/api/tasks/{self.task_id}/', {'title': 'Изменена'}
+        ))
+    
+    def test_mark_completed(self):
+        self.assertInvalidates(lambda: self._write(
+            'patch', f'/api/tasks/{self.task_id}/mark_completed/', {}
+        ))
+    
+    def test_bulk_update(self):
+        self.assertInvalidates(lambda: self._write('patch', '/api/tasks/bulk_update/', {
+            'tasks': [{'id': self.task_id, 'priority': 'high'}]
+        }))
+    
+    def test_bulk_complete(self):
+        self.assertInvalidates(lambda: self._write(
+            'post', '/api/tasks/bulk_complete/', {'ids': [self.task_id]}
+        ))
+    
+    def test_admin_actions(self):
+        model_admin = admin.site._registry[Task]
+        
+        def run_action(name):
+            request = RequestFactory().post('/admin/todo_app/task/')
+            request._messages = CookieStorage(request)
+            getattr(model_admin, name)(request, Task.objects.filter(pk=self.task_id))
+        
+        self.assertInvalidates(lambda: run_action('mark_completed'))
+        self.assertInvalidates(lambda: run_action('mark_pending'))
+    
+    def test_model_save(self):
+        def save():
+            task = self._task()
+            task.title = 'Изменена через save()'
+            task.save()
+        
+        self.assertInvalidates(save)
+    
+    def test_category_rename(self):
+        def rename():
+            self.category.name = 'Работа!'
+            self.category.save()
+        
+        self.assertInvalidates(rename)
+    
+    def test_delete(self):
+        self.assertInvalidates(lambda: self.client.delete(f'/api/tasks/{self.task_id}/'))
@@ -0,0 +1,157 @@
+"""
+Сопоставление Telegram ID с пользователями Django.
+
+Двухуровневый кэш: небольшой LRU в памяти процесса и кэш Django
+(Redis), общий для всех воркеров. При промахе пользователь
+создается через INSERT ... ON CONFLICT DO NOTHING, поэтому
+одновременные запросы одного пользователя не падают на уникальности.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+CACHE_KEY = 'tg_user:{}'
+
+
+def telegram_username(telegram_user_id):
+    """Имя пользователя Django для Telegram ID."""
+    return f'tg_{telegram_user_id}'
+
+
+class _LocalLRU:
+    """Потокобезопасный LRU с TTL для пользователей в памяти процесса."""
+
+    def __init__(self, max_size, ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+_local = _LocalLRU(
+    max_size=getattr(settings, 'TELEGRAM_USER_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'TELEGRAM_USER_LOCAL_TTL', 300),
+)
+
+
+def _cache_get_many(keys):
+    try:
+        return cache.get_many(keys)
+    except Exception as e:
+        logger.warning(f"Telegram user cache unavailable: {e}")
+        return {}
+
+
+def _cache_set_many(values):
+    try:
+        cache.set_many(values, timeout=getattr(settings, 'TELEGRAM_USER_CACHE_TTL', 86400))
+    except Exception as e:
+        logger.warning(f"Telegram user cache unavailable: {e}")
+
+
+def _upsert_users(telegram_user_ids):
+    """Находит или создает пользователей одним-тремя запросами."""
+    usernames = {telegram_username(tid): tid for tid in telegram_user_ids}
+    users = {
+        user.username: user
+        for user in User.objects.filter(username__in=list(usernames))
+    }
+    missing = [username for username in usernames if username not in users]
+    if missing:
+        User.objects.bulk_create(
+            [
+                User(
+                    username=username,
+                    first_name=f'User_{usernames[username]}',
+                    is_active=True
+                )
+                for username in missing
+            ],
+            ignore_conflicts=True
+        )
+        # Перечитываем: часть строк могла создать параллельная транзакция
+        users.update(
+            (user.username, user)
+            for user in User.objects.filter(username__in=missing)
+        )
+    return {usernames[username]: user for username, user in users.items()}
+
+
+def resolve_telegram_users(telegram_user_ids):
+    """Возвращает {telegram_user_id: User} для набора Telegram ID."""
+    result = {}
+    pending = set()
+    for telegram_user_id in set(telegram_user_ids) - {None}:
+        user = _local.get(telegram_user_id)
+        if user is None:
+            pending.add(telegram_user_id)
+        else:
+            result[telegram_user_id] = user
+
+    if pending:
+        cached = _cache_get_many([CACHE_KEY.format(tid) for tid in pending])
+        for telegram_user_id in list(pending):
+            user = cached.get(CACHE_KEY.format(telegram_user_id))
+            if user is not None:
+                result[telegram_user_id] = user
+                _local.set(telegram_user_id, user)
+                pending.discard(telegram_user_id)
+
+    if pending:
+        created = _upsert_users(pending)
+        _cache_set_many({CACHE_KEY.format(tid): user for tid, user in created.items()})
+        for telegram_user_id, user in created.items():
+            _local.set(telegram_user_id, user)
+        result.update(created)
+
+    return result
+
+
+def resolve_telegram_user(telegram_user_id):
+    """Возвращает пользователя Django для Telegram ID, создавая его при необходимости."""
+    return resolve_telegram_users([telegram_user_id]).get(telegram_user_id)
+
+
+def forget_telegram_user(username):
+    """Убирает пользователя из кэшей (например, после удаления)."""
+    if not username.startswith('tg_'):
+        return
+    try:
+        telegram_user_id = int(username[3:])
+    except ValueError:
+        return
+    _local.delete(telegram_user_id)
+    try:
+        cache.delete(CACHE_KEY.format(telegram_user_id))
+    except Exception as e:
+        logger.warning(f"Telegram user cache unavailable: {e}")
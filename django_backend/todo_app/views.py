@@ -3,16 +3,30 @@ API views для ToDo приложения.
 """
 from rest_framework import viewsets, status, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Count, Q
+from .conditional import ConditionalGetMixin
+from .counters import get_user_stats, rebuild_counters, stats_aggregates
 from .models import Category, Task
-from .serializers import CategorySerializer, TaskSerializer, TaskCreateSerializer
+from .pagination import TaskKeysetPagination
+from .reminders import sync_reminders
+from .response_cache import CachedResponseMixin, invalidate_task_lists, task_list_namespace
+from .search import TaskSearchFilter, search_tasks
+from .serializers import (
+    CategorySerializer, TaskSerializer, TaskCreateSerializer, TaskRowSerializer
+)
+from .users import resolve_telegram_users
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
-    """ViewSet для категорий."""
+class CategoryViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    """ViewSet для категорий.
+    
+    Ответы list и retrieve кэшируются до любого изменения категорий.
+    """
+    cache_namespace = 'categories'
     queryset = Category.objects.all()
     serializer_class = CategorySerializer
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
@@ -21,15 +35,24 @@ class CategoryViewSet(viewsets.ModelViewSet):
     ordering = ['name']
 
 
-class TaskViewSet(viewsets.ModelViewSet):
-    """ViewSet для задач."""
+class TaskViewSet(CachedResponseMixin, ConditionalGetMixin, viewsets.ModelViewSet):
+    """ViewSet для задач.
+    
+    Ответы by_telegram_user и stats кэшируются по пользователю до
+    изменения его задач.
+    """
     queryset = Task.objects.select_related('category', 'user').all()
     serializer_class = TaskSerializer
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, TaskSearchFilter, filters.OrderingFilter]
     filterset_fields = ['status', 'priority', 'category', 'user']
     search_fields = ['title', 'description']
     ordering_fields = ['created_at', 'updated_at', 'due_date', 'priority']
     ordering = ['-created_at']
+    pagination_class = TaskKeysetPagination
+    # В задачах есть category_name - ETag и кэш меняются и при правке категорий
+    etag_namespaces = ('categories',)
+    # Действия, ответы которых кэшируются по telegram_user_id
+    CACHED_ACTIONS = ('by_telegram_user', 'stats', 'dashboard')
     
     def get_serializer_class(self):
         """Возвращает соответствующий сериализатор."""
@@ -37,6 +60,79 @@ class TaskViewSet(viewsets.ModelViewSet):
             return TaskCreateSerializer
         return TaskSerializer
     
+    def get_sparse_fields(self):
+        """Поля ответа из ?fields=id,title,status (None - все поля)."""
+        raw = self.request.query_params.get('fields')
+        if not raw:
+            return None
+        fields = [field.strip() for field in raw.split(',') if field.strip()]
+        unknown = [field for field in fields if field not in TaskSerializer.Meta.fields]
+        if unknown:
+            raise ValidationError({'fields': [f'Unknown fields: {", ".join(unknown)}']})
+        return fields
+    
+    def get_serializer(self, *args, **kwargs):
+        """Применяет ?fields= к ответам на GET запросы."""
+        if self.request.method == 'GET' and self.get_serializer_class() is TaskSerializer:
+            kwargs.setdefault('fields', self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+    
+    def _cached_telegram_user_id(self):
+        """Telegram ID кэшируемого запроса или None."""
+        telegram_user_id = self.request.query_params.get('telegram_user_id', '')
+        if self.action not in self.CACHED_ACTIONS or not telegram_user_id.lstrip('-').isdigit():
+            return None
+        return int(telegram_user_id)
+    
+    def get_cache_namespace(self):
+        telegram_user_id = self._cached_telegram_user_id()
+        if telegram_user_id is None:
+            return None
+        return task_list_namespace(telegram_user_id)
+    
+    def get_cache_metrics_name(self, namespace):
+        return self.action if self.action in ('stats', 'dashboard') else 'tasks'
+    
+    def get_cache_timeout(self):
+        """Время жизни записи ограничено ближайшим сроком задачи.
+        
+        is_overdue и счетчик overdue меняются со временем без записи в
+        БД, поэтому запись не должна пережить срок открытой задачи.
+        """
+        from django.utils import timezone
+        timeout = super().get_cache_timeout()
+        now = timezone.now()
+        next_due_date = (
+            Task.objects.filter(
+                telegram_user_id=self._cached_telegram_user_id(),
+                status__in=Task.OPEN_STATUSES,
+                due_date__gt=now
+            )
+            .order_by('due_date')
+            .values_list('due_date', flat=True)
+            .first()
+        )
+        if next_due_date is not None:
+            timeout = min(timeout, int((next_due_date - now).total_seconds()) + 1)
+        return timeout
+    
+    def list(self, request, *args, **kwargs):
+        tasks = self.filter_queryset(self.get_queryset())
+        return self.conditional_response(tasks, lambda: self._list_response(tasks))
+    
+    def get_etag_aggregates(self):
+        """Добавляет к ETag число просроченных задач.
+        
+        is_overdue меняется со временем без изменения updated_at.
+        """
+        from django.utils import timezone
+        aggregates = super().get_etag_aggregates()
+        aggregates['overdue'] = Count('pk', filter=Q(
+            due_date__lt=timezone.now(),
+            status__in=Task.OPEN_STATUSES
+        ))
+        return aggregates
+    
     def get_queryset(self):
         """Фильтрует задачи по параметрам запроса."""
         queryset = super().get_queryset()
@@ -84,13 +180,265 @@ class TaskViewSet(viewsets.ModelViewSet):
         if status_filter:
             tasks = tasks.filter(status=status_filter)
         
+        return self.cached_response(
+            lambda: self.conditional_response(tasks, lambda: self._list_response(tasks))
+        )
+    
+    @action(detail=False, methods=['get'])
+    def dashboard(self, request):
+        """Возвращает данные окна списка задач одним ответом.
+        
+        {'tasks': страница как в by_telegram_user, 'stats': статистика как
+        в stats, 'categories': все категории}. Страница и ETag строятся
+        по одному queryset задач пользователя, статистика читается из
+        материализованных счетчиков. Принимает cursor, page_size и fields.
+        """
+        telegram_user_id = request.query_params.get('telegram_user_id', '')
+        if not telegram_user_id.lstrip('-').isdigit():
+            return Response(
+                {'error': 'telegram_user_id must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        tasks = self.get_queryset().filter(telegram_user_id=telegram_user_id)
+        
+        def build_response():
+            return Response({
+                'tasks': self._list_response(tasks).data,
+                'stats': get_user_stats(int(telegram_user_id)),
+                'categories': CategorySerializer(
+                    Category.objects.order_by('name'), many=True
+                ).data,
+            })
+        
+        return self.cached_response(lambda: self.conditional_response(tasks, build_response))
+    
+    def _list_response(self, tasks):
+        """Сериализует (постранично) список задач.
+        
+        Списки только читаются, поэтому строятся через values() и
+        TaskRowSerializer, а не через модели и TaskSerializer.
+        """
+        rows = TaskRowSerializer(self.get_sparse_fields())
+        tasks = rows.queryset(tasks)
         page = self.paginate_queryset(tasks)
         if page is not None:
-            serializer = self.get_serializer(page, many=True)
-            return self.get_paginated_response(serializer.data)
+            return self.get_paginated_response(rows.to_representation(page))
         
-        serializer = self.get_serializer(tasks, many=True)
-        return Response(serializer.data)
+        return Response(rows.to_representation(tasks))
+    
+    # Ограничения ранжированного поиска (?q=)
+    SEARCH_MIN_LENGTH = 2
+    SEARCH_MAX_RESULTS = 50
+    
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """Ищет задачи по заголовку и описанию.
+        
+        Результаты отсортированы по релевантности, у каждого есть rank и
+        headline - фрагмент текста с подсвеченными совпадениями. Принимает
+        telegram_user_id, status и limit (до SEARCH_MAX_RESULTS).
+        """
+        query = request.query_params.get('q', '').strip()
+        if len(query) < self.SEARCH_MIN_LENGTH:
+            return Response(
+                {'error': f'q must be at least {self.SEARCH_MIN_LENGTH} characters'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            limit = int(request.query_params.get('limit', 20))
+        except ValueError:
+            limit = 20
+        limit = max(1, min(limit, self.SEARCH_MAX_RESULTS))
+        
+        tasks = self.get_queryset()
+        status_filter = request.query_params.get('status')
+        if status_filter:
+            tasks = tasks.filter(status=status_filter)
+        
+        mode, tasks = search_tasks(tasks, query, limit)
+        results = self.get_serializer(tasks, many=True).data
+        for task, data in zip(tasks, results):
+            data['rank'] = round(float(task.search_rank or 0), 4)
+            data['headline'] = task.search_headline
+        
+        return Response({'query': query, 'mode': mode, 'results': results})
+    
+    # Максимальное количество элементов в одном массовом запросе
+    BULK_MAX_ITEMS = 500
+    
+    def _bulk_items(self, request, key):
+        """Достает список элементов массового запроса или возвращает ошибку."""
+        items = request.data.get(key) if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return None, Response(
+                {'error': f'{key} must be a non-empty list'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > self.BULK_MAX_ITEMS:
+            return None, Response(
+                {'error': f'at most {self.BULK_MAX_ITEMS} items per request'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return items, None
+    
+    @staticmethod
+    def _bulk_response(results):
+        """Формирует ответ массового запроса с результатом по каждому элементу."""
+        succeeded = sum(1 for item in results if item['status'] < 400)
+        return Response({
+            'succeeded': succeeded,
+            'failed': len(results) - succeeded,
+            'results': results,
+        })
+    
+    @action(detail=False, methods=['post'])
+    def bulk_create_for_telegram(self, request):
+        """Создает несколько задач одним INSERT в одной транзакции.
+        
+        Каждый элемент проверяется TaskCreateSerializer, невалидные
+        элементы возвращаются с ошибками и не мешают остальным.
+        """
+        items, error = self._bulk_items(request, 'tasks')
+        if error:
+            return error
+        
+        results = [None] * len(items)
+        valid = []
+        for index, item in enumerate(items):
+            serializer = TaskCreateSerializer(data=item)
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'status': 400, 'errors': serializer.errors}
+            elif not serializer.validated_data.get('telegram_user_id'):
+                results[index] = {
+                    'index': index,
+                    'status': 400,
+                    'errors': {'telegram_user_id': ['This field is required.']}
+                }
+            else:
+                valid.append((index, serializer.validated_data))
+        
+        # Пользователи всех элементов находятся/создаются одним проходом
+        users = resolve_telegram_users(data['telegram_user_id'] for _, data in valid)
+        tasks = [
+            (index, Task(user=users[data['telegram_user_id']], **data))
+            for index, data in valid
+        ]
+        
+        with transaction.atomic():
+            Task.objects.bulk_create([task for _, task in tasks])
+            # bulk_create не отправляет post_save - счетчики пересобираем,
+            # напоминания планируем и кэш сбрасываем явно
+            telegram_user_ids = {task.telegram_user_id for _, task in tasks}
+            rebuild_counters(telegram_user_ids)
+            sync_reminders((task for _, task in tasks), created=True)
+            invalidate_task_lists(telegram_user_ids)
+        
+        for index, task in tasks:
+            results[index] = {'index': index, 'status': 201, 'data': TaskSerializer(task).data}
+        
+        return self._bulk_response(results)
+    
+    @action(detail=False, methods=['patch'])
+    def bulk_update(self, request):
+        """Частично обновляет несколько задач одним bulk_update.
+        
+        Элементы - объекты с id и изменяемыми полями, каждый проверяется
+        TaskSerializer(partial=True).
+        """
+        items, error = self._bulk_items(request, 'tasks')
+        if error:
+            return error
+        
+        ids = [item.get('id') for item in items if isinstance(item, dict)]
+        instances = self.get_queryset().in_bulk([pk for pk in ids if isinstance(pk, str)])
+        telegram_user_ids = {task.telegram_user_id for task in instances.values()}
+        
+        from django.utils import timezone
+        now = timezone.now()
+        results = []
+        changed = {}
+        fields = {'updated_at'}
+        for index, item in enumerate(items):
+            pk = item.get('id') if isinstance(item, dict) else None
+            task = instances.get(pk) if isinstance(pk, str) else None
+            if task is None:
+                results.append({'index': index, 'status': 404, 'errors': {'id': ['Not found.']}})
+                continue
+            serializer = TaskSerializer(task, data=item, partial=True)
+            if not serializer.is_valid():
+                results.append({'index': index, 'status': 400, 'errors': serializer.errors})
+                continue
+            validated_data = dict(serializer.validated_data)
+            TaskSerializer.apply_completion(task, validated_data)
+            TaskSerializer.apply_due_date_change(task, validated_data)
+            for field, value in validated_data.items():
+                setattr(task, field, value)
+            task.updated_at = now
+            fields.update(validated_data)
+            changed[task.pk] = task
+            results.append({'index': index, 'status': 200, 'task': task})
+        
+        telegram_user_ids.update(task.telegram_user_id for task in changed.values())
+        with transaction.atomic():
+            Task.objects.bulk_update(changed.values(), sorted(fields))
+            rebuild_counters(telegram_user_ids)
+            sync_reminders(changed.values())
+            invalidate_task_lists(telegram_user_ids)
+        
+        for result in results:
+            if 'task' in result:
+                result['data'] = TaskSerializer(result.pop('task')).data
+        
+        return self._bulk_response(results)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_complete(self, request):
+        """Отмечает несколько задач завершенными одним bulk_update.
+        
+        Уже завершенные задачи не меняются (completed_at и updated_at
+        остаются прежними) и возвращаются со статусом 200.
+        """
+        ids, error = self._bulk_items(request, 'ids')
+        if error:
+            return error
+        
+        instances = self.get_queryset().in_bulk(
+            [pk for pk in ids if isinstance(pk, str)]
+        )
+        
+        from django.utils import timezone
+        now = timezone.now()
+        results = []
+        changed = {}
+        for index, pk in enumerate(ids):
+            task = instances.get(pk) if isinstance(pk, str) else None
+            if task is None:
+                results.append({'index': index, 'status': 404, 'errors': {'id': ['Not found.']}})
+                continue
+            if task.status != 'completed':
+                task.status = 'completed'
+                task.completed_at = now
+                task.updated_at = now
+                changed[task.pk] = task
+            results.append({'index': index, 'status': 200, 'task': task})
+        
+        if changed:
+            with transaction.atomic():
+                Task.objects.bulk_update(
+                    changed.values(), ['status', 'completed_at', 'updated_at']
+                )
+                telegram_user_ids = {task.telegram_user_id for task in changed.values()}
+                rebuild_counters(telegram_user_ids)
+                sync_reminders(changed.values())
+                invalidate_task_lists(telegram_user_ids)
+        
+        for result in results:
+            if 'task' in result:
+                result['data'] = TaskSerializer(result.pop('task')).data
+        
+        return self._bulk_response(results)
     
     @action(detail=True, methods=['patch'])
     def mark_completed(self, request, pk=None):
@@ -104,29 +452,67 @@ class TaskViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(task)
         return Response(serializer.data)
     
+    # Поля, по которым stats может строить разбивку (?group_by=...)
+    STATS_GROUP_FIELDS = {
+        'priority': ('priority',),
+        'category': ('category', 'category__name'),
+    }
+    
     @action(detail=False, methods=['get'])
     def stats(self, request):
-        """Возвращает статистику задач."""
+        """Возвращает статистику задач.
+        
+        Все счетчики считаются одним запросом через условную агрегацию.
+        Параметр group_by=priority|category добавляет разбивку по группам,
+        которая тоже строится одним GROUP BY запросом. Статистика одного
+        пользователя без дополнительных параметров читается из
+        материализованных счетчиков. Статистика пользователя кэшируется.
+        """
+        return self.cached_response(lambda: self._stats_response(request))
+    
+    def _stats_response(self, request):
         telegram_user_id = request.query_params.get('telegram_user_id')
+        group_by = request.query_params.get('group_by')
+        
+        if telegram_user_id and set(request.query_params) == {'telegram_user_id'}:
+            if not telegram_user_id.lstrip('-').isdigit():
+                return Response(
+                    {'error': 'telegram_user_id must be an integer'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            return Response(get_user_stats(int(telegram_user_id)))
+        
         queryset = self.get_queryset()
         
         if telegram_user_id:
             queryset = queryset.filter(telegram_user_id=telegram_user_id)
         
-        stats = {
-            'total': queryset.count(),
-            'pending': queryset.filter(status='pending').count(),
-            'in_progress': queryset.filter(status='in_progress').count(),
-            'completed': queryset.filter(status='completed').count(),
-            'cancelled': queryset.filter(status='cancelled').count(),
-        }
+        aggregates = stats_aggregates()
         
-        # Просроченные задачи
-        from django.utils import timezone
-        overdue_count = queryset.filter(
-            due_date__lt=timezone.now(),
-            status__in=['pending', 'in_progress']
-        ).count()
-        stats['overdue'] = overdue_count
+        if not group_by:
+            return Response(queryset.aggregate(**aggregates))
+        
+        if group_by not in self.STATS_GROUP_FIELDS:
+            return Response(
+                {'error': f'group_by must be one of: {", ".join(self.STATS_GROUP_FIELDS)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        group_fields = self.STATS_GROUP_FIELDS[group_by]
+        # order_by() сбрасывает сортировку модели, иначе она попадет в GROUP BY
+        rows = queryset.order_by().values(*group_fields).annotate(**aggregates)
+        
+        stats = dict.fromkeys(aggregates, 0)
+        groups = []
+        for row in rows:
+            group = {'key': row[group_fields[0]]}
+            if group_by == 'category':
+                group['name'] = row['category__name']
+            for counter in aggregates:
+                group[counter] = row[counter]
+                stats[counter] += row[counter]
+            groups.append(group)
         
-        return Response(stats)
\ No newline at end of file
+        stats['group_by'] = group_by
+        stats['groups'] = groups
+        return Response(stats)
@@ -3,6 +3,7 @@ Celery configuration for todo_project.
 """
 import os
 from celery import Celery
+from celery.signals import worker_process_init
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todo_project.settings')
@@ -14,4 +15,12 @@ app = Celery('todo_project')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Load task modules from all registered Django apps.
-app.autodiscover_tasks()
\ No newline at end of file
+app.autodiscover_tasks()
+
+
+@worker_process_init.connect
+def set_id_process_index(**kwargs):
+    """Дает каждому процессу пула свой номер воркера, если аренда ID выключена."""
+    from billiard.process import current_process
+    from todo_app.ids import set_process_index
+    set_process_index(current_process().index)
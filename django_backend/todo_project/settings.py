@@ -3,6 +3,7 @@ Django settings for todo_project project.
 """
 
 from pathlib import Path
+from importlib.util import find_spec
 import os
 from dotenv import load_dotenv
 
@@ -75,6 +76,23 @@ DATABASES = {
     }
 }
 
+# Cache (Redis)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.getenv('CACHE_REDIS_URL', 'redis://localhost:6379/2'),
+        'KEY_PREFIX': 'todo',
+    }
+}
+
+# Кэш сопоставления Telegram ID -> User (см. todo_app/users.py)
+TELEGRAM_USER_CACHE_SIZE = int(os.getenv('TELEGRAM_USER_CACHE_SIZE', '10000'))
+TELEGRAM_USER_LOCAL_TTL = int(os.getenv('TELEGRAM_USER_LOCAL_TTL', '300'))
+TELEGRAM_USER_CACHE_TTL = int(os.getenv('TELEGRAM_USER_CACHE_TTL', '86400'))
+
+# Время жизни записей кэша ответов API, с (см. todo_app/response_cache.py)
+RESPONSE_CACHE_TIMEOUT = int(os.getenv('RESPONSE_CACHE_TIMEOUT', '300'))
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -109,14 +127,22 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # REST Framework settings
+# JSON на orjson, если он установлен (todo_app/renderers.py)
+USE_ORJSON = (
+    os.getenv('USE_ORJSON', 'True').lower() == 'true'
+    and find_spec('orjson') is not None
+)
+
 REST_FRAMEWORK = {
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 20,
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'todo_app.renderers.ORJSONRenderer' if USE_ORJSON
+        else 'rest_framework.renderers.JSONRenderer',
     ],
     'DEFAULT_PARSER_CLASSES': [
-        'rest_framework.parsers.JSONParser',
+        'todo_app.renderers.ORJSONParser' if USE_ORJSON
+        else 'rest_framework.parsers.JSONParser',
     ],
 }
 
@@ -130,6 +156,65 @@ CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
+CELERY_BEAT_SCHEDULE = {
+    # Задачи становятся просроченными со временем, без записи в БД
+    'refresh-overdue-counters': {
+        'task': 'todo_app.tasks.refresh_overdue_counters',
+        'schedule': 60.0,
+    },
+    # Отложенные (429, лимит чата) сообщения доставки
+    'drain-delivery-queue': {
+        'task': 'todo_app.tasks.drain_delivery_queue',
+        'schedule': 5.0,
+    },
+    # Напоминания о сроках задач (todo_app/reminders.py)
+    'dispatch-due-reminders': {
+        'task': 'todo_app.tasks.dispatch_due_reminders',
+        'schedule': float(os.getenv('REMINDER_DISPATCH_INTERVAL', '10')),
+    },
+    # Повторные уведомления отсекает Task.last_notified_at
+    'check-overdue-tasks': {
+        'task': 'todo_app.tasks.check_overdue_tasks',
+        'schedule': float(os.getenv('OVERDUE_CHECK_INTERVAL', '300')),
+    },
+}
+
+# Проверка просроченных задач (todo_app.tasks.check_overdue_tasks)
+OVERDUE_CHUNK_SIZE = int(os.getenv('OVERDUE_CHUNK_SIZE', '2000'))
+NOTIFICATION_BATCH_SIZE = int(os.getenv('NOTIFICATION_BATCH_SIZE', '100'))
+OVERDUE_NOTIFICATION_MAX_TASKS = int(os.getenv('OVERDUE_NOTIFICATION_MAX_TASKS', '10'))
+# Через сколько часов напоминать о просроченной задаче повторно
+OVERDUE_RENOTIFY_INTERVAL = int(os.getenv('OVERDUE_RENOTIFY_INTERVAL', '24'))
+
+# Поиск задач (todo_app/search.py)
+# Запросы не длиннее этого ищутся по подстроке заголовка (trigram индекс)
+SEARCH_TRIGRAM_MAX_LENGTH = int(os.getenv('SEARCH_TRIGRAM_MAX_LENGTH', '3'))
+SEARCH_HIGHLIGHT_START = os.getenv('SEARCH_HIGHLIGHT_START', '<b>')
+SEARCH_HIGHLIGHT_STOP = os.getenv('SEARCH_HIGHLIGHT_STOP', '</b>')
+
+# Напоминания о сроках задач (todo_app/reminders.py)
+REMINDERS_REDIS_URL = os.getenv('REMINDERS_REDIS_URL', CELERY_BROKER_URL)
+REMINDER_BATCH_SIZE = int(os.getenv('REMINDER_BATCH_SIZE', '500'))
+# За сколько минут до срока напоминать
+REMINDER_LEAD_MINUTES = int(os.getenv('REMINDER_LEAD_MINUTES', '0'))
+REMINDER_DISPATCH_SECONDS = float(os.getenv('REMINDER_DISPATCH_SECONDS', '8'))
+
+# Доставка уведомлений в Telegram (todo_app/delivery.py)
+TELEGRAM_BOT_API_URL = os.getenv('TELEGRAM_BOT_API_URL')
+DELIVERY_REDIS_URL = os.getenv('DELIVERY_REDIS_URL', CELERY_BROKER_URL)
+DELIVERY_BATCH_SIZE = int(os.getenv('DELIVERY_BATCH_SIZE', '100'))
+DELIVERY_CONCURRENCY = int(os.getenv('DELIVERY_CONCURRENCY', '8'))
+# Лимиты Telegram: ~30 сообщений в секунду всего и 1 в секунду на чат
+DELIVERY_GLOBAL_RATE = float(os.getenv('DELIVERY_GLOBAL_RATE', '30'))
+DELIVERY_PER_CHAT_RATE = float(os.getenv('DELIVERY_PER_CHAT_RATE', '1'))
+DELIVERY_MAX_ATTEMPTS = int(os.getenv('DELIVERY_MAX_ATTEMPTS', '5'))
+DELIVERY_RETRY_BASE = float(os.getenv('DELIVERY_RETRY_BASE', '1.0'))
+DELIVERY_DRAIN_SECONDS = float(os.getenv('DELIVERY_DRAIN_SECONDS', '50'))
+
+# Аренда номеров воркера генератора ID (todo_app.ids); пустой URL -
+# номер берется из ID_WORKER_ID без аренды
+ID_WORKER_REDIS_URL = os.getenv('ID_WORKER_REDIS_URL', CELERY_BROKER_URL)
+ID_WORKER_LEASE_TTL = int(os.getenv('ID_WORKER_LEASE_TTL', '60'))
 
 # Logging
 LOGGING = {
@@ -1,52 +1,432 @@
 """
 Клиент для работы с Django API.
 """
+import asyncio
 import aiohttp
 import logging
-from typing import List, Dict, Optional
-from config import DJANGO_API_URL
+import random
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, List, Dict, Optional
+from config import (
+    DJANGO_API_URL, API_POOL_LIMIT, API_POOL_LIMIT_PER_HOST, API_KEEPALIVE_TIMEOUT,
+    API_DNS_CACHE_TTL, API_TIMEOUT, API_CONNECT_TIMEOUT,
+    API_RETRIES, API_RETRY_BACKOFF, API_RETRY_BACKOFF_MAX, API_HEDGE_DELAY,
+    API_BREAKER_FAILURES, API_BREAKER_RESET,
+    TASK_SNAPSHOT_TTL, TASK_SNAPSHOT_MAX_SIZE, CATEGORIES_CACHE_TTL, API_ETAG_CACHE_SIZE
+)
 
 logger = logging.getLogger(__name__)
 
 
+class AsyncTTLCache:
+    """Асинхронный in-process кэш с TTL и single-flight загрузкой.
+    
+    Одновременные промахи по одному ключу ждут один и тот же запрос
+    вместо того, чтобы каждый шел в API.
+    """
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._entries: Dict[Any, tuple] = {}
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+    
+    async def get_or_load(self, key, loader: Callable[[], Awaitable[Any]],
+                          cache_if: Callable[[Any], bool] = lambda value: True):
+        """Возвращает значение из кэша или загружает его через loader.
+        
+        Значения, для которых cache_if возвращает False (например, ошибки
+        API), отдаются вызывающим, но не кэшируются.
+        """
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+        
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            self.coalesced += 1
+            return await asyncio.shield(inflight)
+        
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            value = await loader()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Помечаем исключение полученным, если ожидающих не было
+            future.exception()
+            raise
+        else:
+            if cache_if(value):
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+    
+    def set(self, key, value):
+        """Кладет значение, полученное в обход loader (например, в составном ответе)."""
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+    
+    def invalidate(self, key=None):
+        """Сбрасывает один ключ или весь кэш."""
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+    
+    def stats(self) -> Dict:
+        """Возвращает счетчики попаданий и промахов."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+            'size': len(self._entries),
+            'hit_rate': (self.hits + self.coalesced) / lookups if lookups else 0.0,
+        }
+
+
+class CircuitBreaker:
+    """Размыкатель цепи для запросов к API.
+    
+    closed: запросы идут как обычно. После failure_threshold неудачных
+    запросов подряд цепь размыкается (open) и запросы сразу отклоняются.
+    Через reset_timeout секунд пропускается один пробный запрос
+    (half_open): успех замыкает цепь, неудача снова размыкает.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self.transitions = Counter()
+    
+    def allow_request(self) -> bool:
+        """Можно ли отправить запрос сейчас."""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self.opened_at < self.reset_timeout:
+                return False
+            self._set_state(self.HALF_OPEN)
+        if self._trial_in_flight:
+            return False
+        self._trial_in_flight = True
+        return True
+    
+    def record_success(self):
+        self.failures = 0
+        self._trial_in_flight = False
+        if self.state != self.CLOSED:
+            self._set_state(self.CLOSED)
+    
+    def record_failure(self):
+        self.failures += 1
+        self._trial_in_flight = False
+        if self.state == self.HALF_OPEN or (
+                self.state == self.CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = time.monotonic()
+            self._set_state(self.OPEN)
+    
+    def release(self):
+        """Освобождает пробный запрос, завершившийся без результата (отмена)."""
+        self._trial_in_flight = False
+    
+    def _set_state(self, state: str):
+        logger.warning(f"API circuit breaker: {self.state} -> {state}")
+        self.state = state
+        self.transitions[state] += 1
+    
+    def stats(self) -> Dict:
+        return {
+            'state': self.state,
+            'consecutive_failures': self.failures,
+            'opened': self.transitions[self.OPEN],
+            'half_opened': self.transitions[self.HALF_OPEN],
+            'closed': self.transitions[self.CLOSED],
+        }
+
+
+class APIUnavailable(Exception):
+    """API не ответил: ошибка соединения, таймаут или 5xx."""
+
+
 class APIClient:
-    """Клиент для работы с Django API."""
+    """Клиент для работы с Django API.
+    
+    Держит одну долгоживущую aiohttp-сессию с ограниченным пулом
+    keep-alive соединений. Глобальный api_client открывается в main()
+    через start() и закрывается через close() при остановке бота.
+    """
+    
+    # Поля задач, которые бот показывает в списке и карточке задачи
+    # (списки запрашиваются с ?fields=, карточка берется из снимка)
+    TASK_LIST_FIELDS = 'id,title,description,status,priority,category_name,due_date,created_at'
+    
+    # Таймауты по префиксу пути (секунды), остальные запросы - API_TIMEOUT
+    ENDPOINT_TIMEOUTS = {
+        'categories/': 3.0,
+        'tasks/by_telegram_user/': 3.0,
+        'tasks/dashboard/': 3.0,
+        'tasks/stats/': 2.0,
+        'tasks/search/': 5.0,
+        'tasks/bulk_': 15.0,
+    }
+    
+    # Методы, которые можно безопасно повторять
+    IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
     
     def __init__(self):
         self.base_url = DJANGO_API_URL
         self.session = None
+        self._owns_session = False
+        # task_id -> (telegram_user_id, время получения, задача)
+        self._task_snapshots = OrderedDict()
+        self.categories_cache = AsyncTTLCache(CATEGORIES_CACHE_TTL)
+        # (url, params) -> (ETag, тело ответа) для условных GET и для
+        # ответа устаревшими данными, пока API недоступен
+        self._etag_cache = OrderedDict()
+        self.breaker = CircuitBreaker(API_BREAKER_FAILURES, API_BREAKER_RESET)
+        self.metrics = Counter()
+    
+    async def start(self):
+        """Открывает сессию с пулом соединений, если она еще не открыта."""
+        if self.session is not None and not self.session.closed:
+            return
+        
+        connector = aiohttp.TCPConnector(
+            limit=API_POOL_LIMIT,
+            limit_per_host=API_POOL_LIMIT_PER_HOST,
+            keepalive_timeout=API_KEEPALIVE_TIMEOUT,
+            use_dns_cache=True,
+            ttl_dns_cache=API_DNS_CACHE_TTL,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=API_TIMEOUT,
+            sock_connect=API_CONNECT_TIMEOUT
+        )
+        self.session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+        logger.info(
+            f"API session opened (limit={API_POOL_LIMIT}, "
+            f"per_host={API_POOL_LIMIT_PER_HOST})"
+        )
+    
+    async def close(self):
+        """Закрывает сессию и все соединения пула."""
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+        self.session = None
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        # Отдельный экземпляр в async with владеет своей сессией,
+        # уже открытую (общую) сессию контекст не закрывает
+        if self.session is None or self.session.closed:
+            await self.start()
+            self._owns_session = True
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self.session:
-            await self.session.close()
+        if self._owns_session:
+            self._owns_session = False
+            await self.close()
     
     async def _request(self, method: str, endpoint: str, **kwargs) -> Dict:
-        """Выполняет HTTP запрос к API."""
+        """Выполняет HTTP запрос к API.
+        
+        Никогда не бросает исключений: при ошибке возвращает {}, а для
+        GET - последний успешный ответ из кэша ETag, если он есть.
+        Идемпотентные запросы повторяются при ошибках соединения,
+        таймаутах и 5xx, медленные GET дублируются (hedging), а пока
+        размыкатель цепи открыт, запросы к API не отправляются.
+        """
         url = f"{self.base_url}/{endpoint.lstrip('/')}"
         
+        if self.session is None or self.session.closed:
+            await self.start()
+        
+        cache_key = None
+        cached = None
+        if method == 'GET':
+            cache_key = (url, tuple(sorted((kwargs.get('params') or {}).items())))
+            cached = self._etag_cache.get(cache_key)
+            if cached is not None:
+                kwargs['headers'] = {**(kwargs.get('headers') or {}), 'If-None-Match': cached[0]}
+        
+        self.metrics['requests'] += 1
+        if not self.breaker.allow_request():
+            self.metrics['short_circuited'] += 1
+            return self._fallback(method, url, cached, 'circuit breaker is open')
+        
+        kwargs['timeout'] = aiohttp.ClientTimeout(
+            total=self._timeout_for(endpoint),
+            sock_connect=API_CONNECT_TIMEOUT
+        )
+        attempts = 1 + (API_RETRIES if method in self.IDEMPOTENT_METHODS else 0)
+        hedge = method == 'GET' and API_HEDGE_DELAY > 0
+        
         try:
-            async with self.session.request(method, url, **kwargs) as response:
-                if response.status == 200:
-                    return await response.json()
-                elif response.status == 201:
-                    return await response.json()
+            for attempt in range(attempts):
+                if attempt:
+                    if self.breaker.state != CircuitBreaker.CLOSED:
+                        break
+                    self.metrics['retries'] += 1
+                    await asyncio.sleep(self._backoff(attempt))
+                try:
+                    if hedge and self.breaker.state == CircuitBreaker.CLOSED:
+                        status, body, etag = await self._hedged(method, url, **kwargs)
+                    else:
+                        status, body, etag = await self._send(method, url, **kwargs)
+                except APIUnavailable as e:
+                    error = e
+                    continue
+                except Exception as e:
+                    # Ошибка не связана с доступностью API (например, не JSON)
+                    self.breaker.record_success()
+                    logger.error(f"API request error: {e}")
+                    return {}
+                
+                self.breaker.record_success()
+                if status == 304 and cached is not None:
+                    self._etag_cache.move_to_end(cache_key)
+                    return cached[1]
+                elif status == 200:
+                    if cache_key is not None:
+                        self._store_etag(cache_key, etag, body)
+                    return body
+                elif status == 201:
+                    return body
                 else:
-                    logger.error(f"API request failed: {response.status} - {await response.text()}")
+                    if status >= 300:
+                        logger.error(f"API request failed: {status} - {body}")
                     return {}
-        except Exception as e:
-            logger.error(f"API request error: {e}")
-            return {}
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        
+        self.metrics['failures'] += 1
+        self.breaker.record_failure()
+        return self._fallback(method, url, cached, error)
+    
+    async def _send(self, method: str, url: str, **kwargs):
+        """Один HTTP запрос: (статус, тело, ETag) или APIUnavailable."""
+        try:
+            async with self.session.request(method, url, **kwargs) as response:
+                if response.status >= 500:
+                    raise APIUnavailable(f"{response.status} - {await response.text()}")
+                if response.status in (200, 201):
+                    body = await response.json()
+                else:
+                    body = await response.text()
+                return response.status, body, response.headers.get('ETag')
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            raise APIUnavailable(repr(e)) from e
+    
+    async def _hedged(self, method: str, url: str, **kwargs):
+        """Дублирует запрос, если первый не ответил за API_HEDGE_DELAY.
+        
+        Возвращает первый успешный ответ, оставшийся запрос отменяется.
+        """
+        first = asyncio.ensure_future(self._send(method, url, **kwargs))
+        done, _ = await asyncio.wait({first}, timeout=API_HEDGE_DELAY)
+        if done:
+            return first.result()
+        
+        self.metrics['hedged'] += 1
+        second = asyncio.ensure_future(self._send(method, url, **kwargs))
+        pending = {first, second}
+        try:
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is second:
+                            self.metrics['hedge_wins'] += 1
+                        return task.result()
+                if not pending:
+                    raise done.pop().exception()
+        finally:
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+    
+    def _timeout_for(self, endpoint: str) -> float:
+        """Таймаут запроса по самому длинному подходящему префиксу пути."""
+        endpoint = endpoint.lstrip('/')
+        prefixes = [prefix for prefix in self.ENDPOINT_TIMEOUTS if endpoint.startswith(prefix)]
+        if not prefixes:
+            return API_TIMEOUT
+        return self.ENDPOINT_TIMEOUTS[max(prefixes, key=len)]
+    
+    @staticmethod
+    def _backoff(attempt: int) -> float:
+        """Пауза перед повтором: экспонента с полным случайным разбросом."""
+        return random.uniform(0, min(API_RETRY_BACKOFF_MAX, API_RETRY_BACKOFF * 2 ** (attempt - 1)))
+    
+    def _fallback(self, method: str, url: str, cached, reason) -> Dict:
+        """Ответ при недоступном API: устаревшие данные GET или {}."""
+        if cached is not None:
+            self.metrics['stale_served'] += 1
+            logger.warning(f"API unavailable ({reason}), serving stale {method} {url}")
+            return cached[1]
+        logger.error(f"API request error: {method} {url}: {reason}")
+        return {}
+    
+    def stats(self) -> Dict:
+        """Метрики клиента: состояние размыкателя, повторы, кэши."""
+        return {
+            'breaker': self.breaker.stats(),
+            **{name: self.metrics[name] for name in (
+                'requests', 'retries', 'hedged', 'hedge_wins',
+                'failures', 'short_circuited', 'stale_served'
+            )},
+            'etag_cache_size': len(self._etag_cache),
+            'categories_cache': self.categories_cache.stats(),
+        }
+    
+    def _store_etag(self, cache_key, etag: Optional[str], body):
+        """Запоминает валидатор и тело ответа для следующего If-None-Match."""
+        if not etag:
+            self._etag_cache.pop(cache_key, None)
+            return
+        self._etag_cache[cache_key] = (etag, body)
+        self._etag_cache.move_to_end(cache_key)
+        while len(self._etag_cache) > API_ETAG_CACHE_SIZE:
+            self._etag_cache.popitem(last=False)
     
     # Категории
     async def get_categories(self) -> List[Dict]:
-        """Получает список категорий."""
+        """Получает список категорий (через кэш с TTL)."""
+        return await self.categories_cache.get_or_load(
+            'categories',
+            self._fetch_categories,
+            # Пустой dict - ошибка запроса, ее не кэшируем
+            cache_if=lambda result: isinstance(result, list)
+        )
+    
+    async def _fetch_categories(self) -> List[Dict]:
         result = await self._request('GET', 'categories/')
         return result.get('results', []) if 'results' in result else result
     
+    async def get_category(self, category_id: str) -> Optional[Dict]:
+        """Находит категорию по ID в кэшированном списке."""
+        categories = await self.get_categories()
+        return next((c for c in categories if c['id'] == category_id), None)
+    
     async def create_category(self, name: str, description: str = "", color: str = "#007bff") -> Dict:
         """Создает новую категорию."""
         data = {
@@ -54,17 +434,96 @@ class APIClient:
             'description': description,
             'color': color
         }
-        return await self._request('POST', 'categories/', json=data)
+        result = await self._request('POST', 'categories/', json=data)
+        self.categories_cache.invalidate()
+        return result
     
     # Задачи
-    async def get_tasks(self, telegram_user_id: int, status: Optional[str] = None) -> List[Dict]:
-        """Получает задачи пользователя."""
-        params = {'telegram_user_id': telegram_user_id}
+    async def get_tasks_page(self, telegram_user_id: int, status: Optional[str] = None,
+                             cursor: Optional[str] = None,
+                             page_size: Optional[int] = None) -> Dict:
+        """Получает страницу задач пользователя.
+        
+        Возвращает {'results': [...], 'next_cursor': str | None}. Курсор
+        следующей страницы передается обратно в cursor.
+        """
+        params = {'telegram_user_id': telegram_user_id, 'fields': self.TASK_LIST_FIELDS}
         if status:
             params['status'] = status
+        if cursor:
+            params['cursor'] = cursor
+        if page_size:
+            params['page_size'] = page_size
         
         result = await self._request('GET', 'tasks/by_telegram_user/', params=params)
-        return result.get('results', []) if 'results' in result else result
+        if isinstance(result, list):
+            page = {'results': result, 'next_cursor': None}
+        else:
+            page = {
+                'results': result.get('results', []),
+                'next_cursor': result.get('next_cursor')
+            }
+        
+        for task in page['results']:
+            self._remember_task(telegram_user_id, task)
+        return page
+    
+    async def get_tasks(self, telegram_user_id: int, status: Optional[str] = None,
+                        cursor: Optional[str] = None) -> List[Dict]:
+        """Получает задачи пользователя (одну страницу)."""
+        page = await self.get_tasks_page(telegram_user_id, status=status, cursor=cursor)
+        return page['results']
+    
+    async def search_tasks(self, telegram_user_id: int, query: str,
+                           limit: int = 20) -> List[Dict]:
+        """Ищет задачи пользователя по заголовку и описанию.
+        
+        Задачи отсортированы по релевантности, у каждой есть headline -
+        фрагмент текста с подсвеченными совпадениями.
+        """
+        result = await self._request('GET', 'tasks/search/', params={
+            'telegram_user_id': telegram_user_id,
+            'q': query,
+            'fields': self.TASK_LIST_FIELDS,
+            'limit': limit,
+        })
+        tasks = result.get('results', [])
+        for task in tasks:
+            self._remember_task(telegram_user_id, task)
+        return tasks
+    
+    async def get_task(self, task_id: str, telegram_user_id: int,
+                       max_age: float = TASK_SNAPSHOT_TTL) -> Optional[Dict]:
+        """Получает одну задачу пользователя.
+        
+        Если задача недавно (не старше max_age секунд) пришла в списке,
+        возвращается она без запроса к API.
+        """
+        snapshot = self._task_snapshots.get(task_id)
+        if snapshot is not None:
+            owner_id, fetched_at, task = snapshot
+            if owner_id == telegram_user_id and time.monotonic() - fetched_at <= max_age:
+                return task
+        
+        params = {'telegram_user_id': telegram_user_id}
+        task = await self._request('GET', f'tasks/{task_id}/', params=params)
+        if not task:
+            self._forget_task(task_id)
+            return None
+        
+        self._remember_task(telegram_user_id, task)
+        return task
+    
+    def _remember_task(self, telegram_user_id: int, task: Dict):
+        """Запоминает задачу из ответа API для повторного использования."""
+        self._task_snapshots[task['id']] = (telegram_user_id, time.monotonic(), task)
+        self._task_snapshots.move_to_end(task['id'])
+        while len(self._task_snapshots) > TASK_SNAPSHOT_MAX_SIZE:
+            self._task_snapshots.popitem(last=False)
+    
+    def _forget_task(self, task_id: str):
+        """Убирает задачу из снимков после ее изменения."""
+        self._task_snapshots.pop(task_id, None)
     
     async def create_task(self, telegram_user_id: int, title: str, 
                          description: str = "", category_id: Optional[str] = None,
@@ -87,14 +546,47 @@ class APIClient:
     
     async def update_task(self, task_id: str, **kwargs) -> Dict:
         """Обновляет задачу."""
+        self._forget_task(task_id)
         return await self._request('PATCH', f'tasks/{task_id}/', json=kwargs)
     
     async def mark_task_completed(self, task_id: str) -> Dict:
         """Отмечает задачу как завершенную."""
+        self._forget_task(task_id)
         return await self._request('PATCH', f'tasks/{task_id}/mark_completed/')
     
+    async def create_tasks(self, telegram_user_id: int, tasks: List[Dict]) -> Dict:
+        """Создает несколько задач одним запросом.
+        
+        tasks - словари с полями title, description, category,
+        priority, due_date. Возвращает результат по каждому элементу.
+        """
+        data = {
+            'tasks': [{**task, 'telegram_user_id': telegram_user_id} for task in tasks]
+        }
+        return await self._request('POST', 'tasks/bulk_create_for_telegram/', json=data)
+    
+    async def update_tasks(self, telegram_user_id: int, updates: List[Dict]) -> Dict:
+        """Обновляет несколько задач пользователя одним запросом.
+        
+        updates - словари с id задачи и изменяемыми полями.
+        """
+        for update in updates:
+            self._forget_task(update.get('id'))
+        params = {'telegram_user_id': telegram_user_id}
+        return await self._request('PATCH', 'tasks/bulk_update/',
+                                   params=params, json={'tasks': updates})
+    
+    async def mark_tasks_completed(self, telegram_user_id: int, task_ids: List[str]) -> Dict:
+        """Отмечает несколько задач пользователя как завершенные."""
+        for task_id in task_ids:
+            self._forget_task(task_id)
+        params = {'telegram_user_id': telegram_user_id}
+        return await self._request('POST', 'tasks/bulk_complete/',
+                                   params=params, json={'ids': task_ids})
+    
     async def delete_task(self, task_id: str) -> bool:
         """Удаляет задачу."""
+        self._forget_task(task_id)
         result = await self._request('DELETE', f'tasks/{task_id}/')
         return result is not None
     
@@ -102,6 +594,30 @@ class APIClient:
         """Получает статистику задач пользователя."""
         params = {'telegram_user_id': telegram_user_id}
         return await self._request('GET', 'tasks/stats/', params=params)
+    
+    async def get_dashboard(self, telegram_user_id: int, cursor: Optional[str] = None) -> Dict:
+        """Получает страницу задач, статистику и категории одним запросом.
+        
+        Возвращает {'tasks': {'results': [...], 'next_cursor': ...},
+        'stats': {...}}; stats пустой, если запрос не удался. Категории из
+        ответа обновляют кэш категорий.
+        """
+        params = {'telegram_user_id': telegram_user_id, 'fields': self.TASK_LIST_FIELDS}
+        if cursor:
+            params['cursor'] = cursor
+        
+        result = await self._request('GET', 'tasks/dashboard/', params=params)
+        tasks = result.get('tasks') or {}
+        page = {
+            'results': tasks.get('results', []),
+            'next_cursor': tasks.get('next_cursor')
+        }
+        for task in page['results']:
+            self._remember_task(telegram_user_id, task)
+        if isinstance(result.get('categories'), list):
+            self.categories_cache.set('categories', result['categories'])
+        
+        return {'tasks': page, 'stats': result.get('stats') or {}}
 
 
 # Глобальный экземпляр клиента
@@ -11,11 +11,66 @@ BOT_TOKEN = os.getenv('BOT_TOKEN')
 if not BOT_TOKEN:
     raise ValueError("BOT_TOKEN environment variable is required")
 
+# Режим получения апдейтов: polling (один процесс) или webhook
+# (aiohttp сервер, можно запускать несколько реплик за балансировщиком)
+BOT_MODE = os.getenv('BOT_MODE', 'polling').lower()
+if BOT_MODE not in ('polling', 'webhook'):
+    raise ValueError("BOT_MODE must be 'polling' or 'webhook'")
+
+# Webhook: публичный адрес (без пути), секрет из заголовка
+# X-Telegram-Bot-Api-Secret-Token и адрес, который слушает сервер
+WEBHOOK_BASE_URL = os.getenv('WEBHOOK_BASE_URL', '').rstrip('/')
+WEBHOOK_PATH = os.getenv('WEBHOOK_PATH', '/webhook')
+WEBHOOK_SECRET = os.getenv('WEBHOOK_SECRET', '')
+if BOT_MODE == 'webhook' and not WEBHOOK_SECRET:
+    raise ValueError("WEBHOOK_SECRET environment variable is required in webhook mode")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40'))
+WEBAPP_HOST = os.getenv('WEBAPP_HOST', '0.0.0.0')
+WEBAPP_PORT = int(os.getenv('WEBAPP_PORT', '8080'))
+# Сколько секунд при остановке ждать обработки уже принятых апдейтов
+WEBHOOK_SHUTDOWN_TIMEOUT = float(os.getenv('WEBHOOK_SHUTDOWN_TIMEOUT', '30'))
+
 # Django API
 DJANGO_API_URL = os.getenv('DJANGO_API_URL', 'http://localhost:8000/api')
 
+# Пул HTTP соединений к Django API
+API_POOL_LIMIT = int(os.getenv('API_POOL_LIMIT', '100'))
+API_POOL_LIMIT_PER_HOST = int(os.getenv('API_POOL_LIMIT_PER_HOST', '20'))
+API_KEEPALIVE_TIMEOUT = float(os.getenv('API_KEEPALIVE_TIMEOUT', '30'))
+API_DNS_CACHE_TTL = int(os.getenv('API_DNS_CACHE_TTL', '300'))
+API_TIMEOUT = float(os.getenv('API_TIMEOUT', '10'))
+API_CONNECT_TIMEOUT = float(os.getenv('API_CONNECT_TIMEOUT', '3'))
+# Повторы идемпотентных запросов: количество и экспоненциальная пауза
+# со случайным разбросом (база и потолок, секунды)
+API_RETRIES = int(os.getenv('API_RETRIES', '2'))
+API_RETRY_BACKOFF = float(os.getenv('API_RETRY_BACKOFF', '0.1'))
+API_RETRY_BACKOFF_MAX = float(os.getenv('API_RETRY_BACKOFF_MAX', '1'))
+# Через сколько секунд без ответа GET дублируется вторым запросом (0 - не дублировать)
+API_HEDGE_DELAY = float(os.getenv('API_HEDGE_DELAY', '0.5'))
+# Размыкатель цепи: неудач подряд до размыкания и пауза до пробного запроса (секунды)
+API_BREAKER_FAILURES = int(os.getenv('API_BREAKER_FAILURES', '5'))
+API_BREAKER_RESET = float(os.getenv('API_BREAKER_RESET', '15'))
+
+# Сколько секунд задача из списка считается свежей для окна деталей
+TASK_SNAPSHOT_TTL = float(os.getenv('TASK_SNAPSHOT_TTL', '30'))
+TASK_SNAPSHOT_MAX_SIZE = int(os.getenv('TASK_SNAPSHOT_MAX_SIZE', '5000'))
+
+# Сколько ответов GET хранить для условных запросов (If-None-Match)
+API_ETAG_CACHE_SIZE = int(os.getenv('API_ETAG_CACHE_SIZE', '2000'))
+
+# Время жизни кэша категорий в боте (секунды)
+CATEGORIES_CACHE_TTL = float(os.getenv('CATEGORIES_CACHE_TTL', '300'))
+
 # Redis для состояний диалогов
 REDIS_URL = os.getenv('REDIS_URL', 'redis://localhost:6379/1')
+REDIS_POOL_SIZE = int(os.getenv('REDIS_POOL_SIZE', '50'))
+# Сколько секунд ждать свободное соединение пула и ответ Redis
+REDIS_POOL_TIMEOUT = float(os.getenv('REDIS_POOL_TIMEOUT', '5'))
+REDIS_SOCKET_TIMEOUT = float(os.getenv('REDIS_SOCKET_TIMEOUT', '2'))
+# Время жизни брошенного диалога с последнего изменения (секунды)
+DIALOG_STATE_TTL = int(os.getenv('DIALOG_STATE_TTL', '86400'))
+# Раз в сколько апдейтов писать в лог сводку задержек (0 - не писать)
+UPDATE_LATENCY_LOG_EVERY = int(os.getenv('UPDATE_LATENCY_LOG_EVERY', '500'))
 
 # Логирование
 LOG_LEVEL = os.getenv('LOG_LEVEL', 'INFO')
\ No newline at end of file
@@ -5,35 +5,87 @@ from aiogram import F
 from aiogram.types import Message, CallbackQuery
 from aiogram_dialog import Dialog, DialogManager, Window
 from aiogram_dialog.widgets.text import Const, Format
-from aiogram_dialog.widgets.kbd import Button, Column, Back, Start, Select, Group
+from aiogram_dialog.widgets.kbd import Button, Column, Back, Start, Select, Group, Row, SwitchTo
 from aiogram_dialog.widgets.input import TextInput
 
 from states import TaskListSG, CreateTaskSG, MainMenuSG
-from api_client import APIClient
+from api_client import api_client
+
+
+# Статистика, которая показывается, если API не ответил
+EMPTY_STATS = {'total': 0, 'pending': 0, 'in_progress': 0, 'completed': 0, 'overdue': 0}
 
 
 # Список задач
 async def get_tasks_data(dialog_manager: DialogManager, **kwargs):
-    """Получает данные о задачах пользователя."""
+    """Получает данные о задачах пользователя.
+    
+    Страница задач и статистика приходят одним запросом dashboard.
+    """
     user_id = dialog_manager.event.from_user.id
+    cursor = dialog_manager.dialog_data.get('tasks_cursor')
     
-    async with APIClient() as api:
-        tasks = await api.get_tasks(user_id)
-        stats = await api.get_task_stats(user_id)
+    dashboard = await api_client.get_dashboard(user_id, cursor=cursor)
+    page = dashboard['tasks']
+    # Пустой ответ - ошибка запроса
+    stats = {**EMPTY_STATS, **dashboard['stats']}
+    
+    tasks = page['results']
+    dialog_manager.dialog_data['tasks_next_cursor'] = page['next_cursor']
     
     return {
         'tasks': tasks,
         'has_tasks': len(tasks) > 0,
+        'has_next_page': bool(page['next_cursor']),
+        'is_first_page': not cursor,
         'stats': stats
     }
 
 
+async def on_next_page(callback: CallbackQuery, button: Button, manager: DialogManager):
+    """Переход к следующей странице задач."""
+    manager.dialog_data['tasks_cursor'] = manager.dialog_data.get('tasks_next_cursor')
+
+
+async def on_first_page(callback: CallbackQuery, button: Button, manager: DialogManager):
+    """Возврат к первой странице задач."""
+    manager.dialog_data['tasks_cursor'] = None
+
+
 async def on_task_selected(callback: CallbackQuery, widget, manager: DialogManager, task_id: str):
     """Обработка выбора задачи."""
     manager.dialog_data['selected_task_id'] = task_id
     await manager.switch_to(TaskListSG.task_detail)
 
 
+async def on_search_input(message: Message, widget, dialog_manager: DialogManager, text: str):
+    """Обработка ввода поискового запроса."""
+    dialog_manager.dialog_data['search_query'] = text.strip()
+    await dialog_manager.switch_to(TaskListSG.search_results)
+
+
+def _plain_headline(headline: str) -> str:
+    """Заменяет HTML подсветку совпадений на кавычки."""
+    return headline.replace('<b>', '«').replace('</b>', '»')
+
+
+async def get_search_results_data(dialog_manager: DialogManager, **kwargs):
+    """Ищет задачи пользователя по запросу."""
+    user_id = dialog_manager.event.from_user.id
+    query = dialog_manager.dialog_data.get('search_query', '')
+    
+    tasks = await api_client.search_tasks(user_id, query) if len(query) >= 2 else []
+    
+    return {
+        'query': query,
+        'tasks': tasks,
+        'has_tasks': len(tasks) > 0,
+        'headlines': "\n".join(
+            f"• {_plain_headline(task.get('headline') or task['title'])}" for task in tasks
+        ),
+    }
+
+
 async def get_task_detail_data(dialog_manager: DialogManager, **kwargs):
     """Получает детальную информацию о задаче."""
     task_id = dialog_manager.dialog_data.get('selected_task_id')
@@ -42,10 +94,7 @@ async def get_task_detail_data(dialog_manager: DialogManager, **kwargs):
     if not task_id:
         return {'task': None}
     
-    async with APIClient() as api:
-        tasks = await api.get_tasks(user_id)
-    
-    task = next((t for t in tasks if t['id'] == task_id), None)
+    task = await api_client.get_task(task_id, user_id)
     
     return {
         'task': task,
@@ -64,8 +113,7 @@ async def on_complete_task(callback: CallbackQuery, button: Button, manager: Dia
     task_id = manager.dialog_data.get('selected_task_id')
     
     if task_id:
-        async with APIClient() as api:
-            await api.mark_task_completed(task_id)
+        await api_client.mark_task_completed(task_id)
         
         await callback.answer("✅ Задача отмечена как завершенная!")
         await manager.switch_to(TaskListSG.list)
@@ -87,7 +135,26 @@ task_list_dialog = Dialog(
             on_click=on_task_selected,
         ),
         Format("\n📝 У вас пока нет задач", when=~F["has_tasks"]),
+        Row(
+            Button(
+                Const("⏮️ В начало"),
+                id="tasks_first_page",
+                on_click=on_first_page,
+                when=~F["is_first_page"]
+            ),
+            Button(
+                Const("➡️ Далее"),
+                id="tasks_next_page",
+                on_click=on_next_page,
+                when=F["has_next_page"]
+            ),
+        ),
         Column(
+            SwitchTo(
+                Const("🔍 Поиск"),
+                id="search_tasks",
+                state=TaskListSG.search
+            ),
             Start(
                 Const("➕ Создать задачу"),
                 id="create_new_task",
@@ -121,6 +188,33 @@ task_list_dialog = Dialog(
         getter=get_task_detail_data,
         state=TaskListSG.task_detail,
     ),
+    Window(
+        Const("🔍 Поиск задач\n\n"
+              "Введите слово или фразу из заголовка или описания:"),
+        TextInput(
+            id="search_input",
+            on_success=on_search_input,
+        ),
+        SwitchTo(Const("⬅️ Назад к списку"), id="search_back", state=TaskListSG.list),
+        state=TaskListSG.search,
+    ),
+    Window(
+        Format("🔍 Результаты поиска «{query}»\n\n{headlines}", when=F["has_tasks"]),
+        Format("🔍 По запросу «{query}» ничего не найдено", when=~F["has_tasks"]),
+        Select(
+            Format("📝 {item[title]} ({item[status]})"),
+            items="tasks",
+            item_id_getter=lambda item: item['id'],
+            id="search_results",
+            on_click=on_task_selected,
+        ),
+        Column(
+            SwitchTo(Const("🔍 Новый поиск"), id="search_again", state=TaskListSG.search),
+            SwitchTo(Const("⬅️ Назад к списку"), id="search_to_list", state=TaskListSG.list),
+        ),
+        getter=get_search_results_data,
+        state=TaskListSG.search_results,
+    ),
 )
 
 
@@ -139,8 +233,7 @@ async def on_description_input(message: Message, widget, dialog_manager: DialogM
 
 async def get_categories_data(dialog_manager: DialogManager, **kwargs):
     """Получает список категорий."""
-    async with APIClient() as api:
-        categories = await api.get_categories()
+    categories = await api_client.get_categories()
     
     return {
         'categories': categories,
@@ -173,9 +266,7 @@ async def get_task_preview_data(dialog_manager: DialogManager, **kwargs):
     # Получаем название категории
     category_name = "Без категории"
     if data.get('task_category'):
-        async with APIClient() as api:
-            categories = await api.get_categories()
-        category = next((c for c in categories if c['id'] == data['task_category']), None)
+        category = await api_client.get_category(data['task_category'])
         if category:
             category_name = category['name']
     
@@ -192,14 +283,13 @@ async def on_create_task_confirm(callback: CallbackQuery, button: Button, manage
     data = manager.dialog_data
     user_id = manager.event.from_user.id
     
-    async with APIClient() as api:
-        task = await api.create_task(
-            telegram_user_id=user_id,
-            title=data.get('task_title', ''),
-            description=data.get('task_description', ''),
-            category_id=data.get('task_category'),
-            priority=data.get('task_priority', 'medium')
-        )
+    task = await api_client.create_task(
+        telegram_user_id=user_id,
+        title=data.get('task_title', ''),
+        description=data.get('task_description', ''),
+        category_id=data.get('task_category'),
+        priority=data.get('task_priority', 'medium')
+    )
     
     if task:
         await callback.answer("✅ Задача создана!")
@@ -4,11 +4,14 @@
 import asyncio
 import logging
 from aiogram import Bot, Dispatcher
-from aiogram.filters import CommandStart
-from aiogram.types import Message
-from aiogram_dialog import DialogManager, StartMode, setup_dialogs
+from aiogram.filters import CommandStart, ExceptionTypeFilter
+from aiogram.types import ErrorEvent, Message
+from aiogram_dialog import DialogManager, ShowMode, StartMode, setup_dialogs
+from aiogram_dialog.api.exceptions import UnknownIntent, UnknownState
 
-from config import BOT_TOKEN, REDIS_URL
+from config import BOT_TOKEN, BOT_MODE
+from api_client import api_client
+from storage import UpdateLatencyMiddleware, create_storage
 from states import MainMenuSG
 from dialogs import main_menu_dialog, create_task_dialog, task_list_dialog
 
@@ -19,9 +22,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Создание бота и диспетчера
+# Создание бота и диспетчера (состояния диалогов хранятся в Redis)
 bot = Bot(token=BOT_TOKEN)
-dp = Dispatcher()
+dp = Dispatcher(storage=create_storage())
 
 
 async def start_command(message: Message, dialog_manager: DialogManager):
@@ -29,10 +32,18 @@ async def start_command(message: Message, dialog_manager: DialogManager):
     await dialog_manager.start(MainMenuSG.main, mode=StartMode.RESET_STACK)
 
 
-async def main():
-    """Главная функция запуска бота."""
-    logger.info("Запуск ToDo бота...")
-    
+async def on_unknown_intent(event: ErrorEvent, dialog_manager: DialogManager):
+    """Возвращает в главное меню, если состояние диалога истекло или утеряно."""
+    logger.info(f"Dialog state not found, restarting: {event.exception}")
+    if event.update.callback_query:
+        await event.update.callback_query.answer("Диалог устарел, открываю главное меню")
+    await dialog_manager.start(
+        MainMenuSG.main, mode=StartMode.RESET_STACK, show_mode=ShowMode.SEND
+    )
+
+
+def setup_dispatcher():
+    """Регистрирует диалоги и обработчики."""
     # Регистрация диалогов
     dp.include_router(main_menu_dialog)
     dp.include_router(create_task_dialog)
@@ -43,6 +54,19 @@ async def main():
     
     # Регистрация обработчиков
     dp.message.register(start_command, CommandStart())
+    dp.errors.register(on_unknown_intent, ExceptionTypeFilter(UnknownIntent, UnknownState))
+    
+    # Замер времени обработки апдейтов и операций с хранилищем
+    dp.update.outer_middleware(UpdateLatencyMiddleware())
+
+
+async def main():
+    """Главная функция запуска бота в режиме polling."""
+    logger.info("Запуск ToDo бота...")
+    setup_dispatcher()
+    
+    # Общий пул соединений к Django API на все время работы бота
+    await api_client.start()
     
     try:
         # Удаление вебхука и запуск polling
@@ -52,8 +76,16 @@ async def main():
     except Exception as e:
         logger.error(f"Ошибка при запуске бота: {e}")
     finally:
+        await api_client.close()
+        await dp.storage.close()
         await bot.session.close()
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    if BOT_MODE == 'webhook':
+        from webhook import run_webhook
+        logger.info("Запуск ToDo бота в режиме webhook...")
+        setup_dispatcher()
+        run_webhook(dp, bot)
+    else:
+        asyncio.run(main())
\ No newline at end of file
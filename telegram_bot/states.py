@@ -13,6 +13,8 @@ class TaskListSG(StatesGroup):
     """Состояния списка задач."""
     list = State()
     task_detail = State()
+    search = State()
+    search_results = State()
 
 
 class CreateTaskSG(StatesGroup):
@@ -0,0 +1,209 @@
+"""
+Хранилище состояний диалогов в Redis.
+
+Состояния aiogram FSM и стеки/контексты aiogram-dialog хранятся в Redis,
+поэтому переживают перезапуск и общие для всех реплик бота. Записи
+живут DIALOG_STATE_TTL секунд с последнего изменения: брошенные диалоги
+удаляет сам Redis. Данные сериализуются компактно: JSON без пробелов и
+\\u-экранирования кириллицы, а поля контекстов и стеков aiogram-dialog
+со значениями по умолчанию не записываются вовсе.
+
+UpdateLatencyMiddleware измеряет, сколько времени апдейт провел в
+хранилище и сколько занял целиком.
+"""
+import json
+import logging
+import time
+from collections import deque
+from contextvars import ContextVar
+from typing import Any, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.fsm.storage.redis import DefaultKeyBuilder, RedisStorage
+from redis.asyncio import BlockingConnectionPool, Redis
+
+from config import (
+    REDIS_URL, REDIS_POOL_SIZE, REDIS_POOL_TIMEOUT, REDIS_SOCKET_TIMEOUT,
+    DIALOG_STATE_TTL, UPDATE_LATENCY_LOG_EVERY
+)
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Поля со значениями по умолчанию, которые не записываются
+# (Context и Stack из aiogram_dialog.api.entities)
+CONTEXT_DEFAULTS = {'start_data': None, 'dialog_data': {}, 'widget_data': {}}
+STACK_DEFAULTS = {
+    'intents': [],
+    'last_message_id': None,
+    'last_reply_keyboard': False,
+    'last_media_id': None,
+    'last_media_unique_id': None,
+    'last_income_media_group_id': None,
+}
+CONTEXT_FIELDS = {'_intent_id', '_stack_id', 'state', *CONTEXT_DEFAULTS}
+STACK_FIELDS = {'_id', *STACK_DEFAULTS}
+
+
+def _defaults(data: Dict) -> Dict:
+    """Значения по умолчанию для контекста или стека, {} для прочих данных."""
+    if '_intent_id' in data and data.keys() <= CONTEXT_FIELDS:
+        return CONTEXT_DEFAULTS
+    if '_id' in data and data.keys() <= STACK_FIELDS:
+        return STACK_DEFAULTS
+    return {}
+
+
+def compact_dumps(data: Dict[str, Any]) -> str:
+    """Сериализует данные состояния без полей по умолчанию."""
+    defaults = _defaults(data)
+    if defaults:
+        data = {
+            key: value for key, value in data.items()
+            if key not in defaults or value != defaults[key]
+        }
+    if orjson is not None:
+        return orjson.dumps(data).decode()
+    return json.dumps(data, ensure_ascii=False, separators=(',', ':'))
+
+
+def compact_loads(value: str) -> Dict[str, Any]:
+    """Восстанавливает данные состояния вместе с полями по умолчанию."""
+    data = orjson.loads(value) if orjson is not None else json.loads(value)
+    for key, default in _defaults(data).items():
+        if key not in data:
+            # Копия, чтобы изменяемые значения не делились между контекстами
+            data[key] = type(default)() if isinstance(default, (dict, list)) else default
+    return data
+
+
+# Время в хранилище за текущий апдейт: [секунды, операции]
+_storage_time: ContextVar = ContextVar('storage_time', default=None)
+
+
+def _record_storage_time(started: float):
+    timing = _storage_time.get()
+    if timing is None:
+        timing = [0.0, 0]
+        _storage_time.set(timing)
+    timing[0] += time.perf_counter() - started
+    timing[1] += 1
+
+
+class TimedRedisStorage(RedisStorage):
+    """RedisStorage, который учитывает время операций для UpdateLatencyMiddleware."""
+
+    async def set_state(self, key, state=None) -> None:
+        started = time.perf_counter()
+        try:
+            await super().set_state(key, state)
+        finally:
+            _record_storage_time(started)
+
+    async def get_state(self, key):
+        started = time.perf_counter()
+        try:
+            return await super().get_state(key)
+        finally:
+            _record_storage_time(started)
+
+    async def set_data(self, key, data) -> None:
+        started = time.perf_counter()
+        try:
+            await super().set_data(key, data)
+        finally:
+            _record_storage_time(started)
+
+    async def get_data(self, key):
+        started = time.perf_counter()
+        try:
+            return await super().get_data(key)
+        finally:
+            _record_storage_time(started)
+
+
+def create_storage() -> TimedRedisStorage:
+    """Создает хранилище с общим пулом соединений к Redis.
+
+    BlockingConnectionPool при исчерпании пула ждет свободное соединение
+    (до REDIS_POOL_TIMEOUT), а не падает с ошибкой.
+    """
+    pool = BlockingConnectionPool.from_url(
+        REDIS_URL,
+        max_connections=REDIS_POOL_SIZE,
+        timeout=REDIS_POOL_TIMEOUT,
+        socket_timeout=REDIS_SOCKET_TIMEOUT,
+        socket_connect_timeout=REDIS_SOCKET_TIMEOUT,
+        health_check_interval=30,
+    )
+    return TimedRedisStorage(
+        redis=Redis(connection_pool=pool),
+        # with_destiny нужен aiogram-dialog: контексты хранятся под своими ключами
+        key_builder=DefaultKeyBuilder(prefix='fsm', with_destiny=True),
+        state_ttl=DIALOG_STATE_TTL,
+        data_ttl=DIALOG_STATE_TTL,
+        json_dumps=compact_dumps,
+        json_loads=compact_loads,
+    )
+
+
+class UpdateLatencyMiddleware(BaseMiddleware):
+    """Измеряет время обработки апдейтов и долю времени в хранилище.
+
+    Раз в log_every апдейтов пишет в лог медиану и p95 по последним
+    апдейтам.
+    """
+
+    def __init__(self, log_every: int = UPDATE_LATENCY_LOG_EVERY, window: int = 1000):
+        self.log_every = log_every
+        self.updates = 0
+        self._total = deque(maxlen=window)
+        self._storage = deque(maxlen=window)
+        self._storage_ops = deque(maxlen=window)
+
+    async def __call__(self, handler, event, data):
+        # Операции до этого middleware (чтение состояния в
+        # FSMContextMiddleware) тоже входят в апдейт
+        earlier = (_storage_time.get() or (0.0, 0))[0]
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        finally:
+            total = time.perf_counter() - started + earlier
+            storage_time, storage_ops = _storage_time.get() or (0.0, 0)
+            _storage_time.set(None)
+            self._total.append(total)
+            self._storage.append(storage_time)
+            self._storage_ops.append(storage_ops)
+            self.updates += 1
+            if self.log_every and self.updates % self.log_every == 0:
+                stats = self.stats()
+                logger.info(
+                    f"Update latency over last {stats['window']} updates: "
+                    f"total p50 {stats['total_p50_ms']:.1f} ms, p95 {stats['total_p95_ms']:.1f} ms; "
+                    f"storage p50 {stats['storage_p50_ms']:.1f} ms, p95 {stats['storage_p95_ms']:.1f} ms, "
+                    f"{stats['storage_ops_avg']:.1f} ops/update"
+                )
+
+    @staticmethod
+    def _percentile(values, fraction):
+        if not values:
+            return 0.0
+        values = sorted(values)
+        return values[min(len(values) - 1, int(len(values) * fraction))]
+
+    def stats(self) -> Dict:
+        """Возвращает задержки по последним апдейтам (мс)."""
+        return {
+            'updates': self.updates,
+            'window': len(self._total),
+            'total_p50_ms': self._percentile(self._total, 0.5) * 1000,
+            'total_p95_ms': self._percentile(self._total, 0.95) * 1000,
+            'storage_p50_ms': self._percentile(self._storage, 0.5) * 1000,
+            'storage_p95_ms': self._percentile(self._storage, 0.95) * 1000,
+            'storage_ops_avg': sum(self._storage_ops) / len(self._storage_ops) if self._storage_ops else 0.0,
+        }
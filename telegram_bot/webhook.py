@@ -0,0 +1,108 @@
+"""
+Webhook режим бота: aiohttp сервер на интеграции aiogram.
+
+Сервер не хранит состояния между апдейтами, поэтому его можно запускать
+в нескольких репликах за балансировщиком. Апдейты принимаются с
+проверкой секрета (X-Telegram-Bot-Api-Secret-Token, иначе 401) и
+обрабатываются в фоне: Telegram сразу получает ответ. При остановке
+сервер перестает принимать запросы и ждет обработки уже принятых
+апдейтов не дольше WEBHOOK_SHUTDOWN_TIMEOUT.
+"""
+import asyncio
+import logging
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler, setup_application
+from aiohttp import web
+
+from api_client import api_client
+from config import (
+    WEBHOOK_BASE_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_MAX_CONNECTIONS,
+    WEBAPP_HOST, WEBAPP_PORT, WEBHOOK_SHUTDOWN_TIMEOUT
+)
+
+logger = logging.getLogger(__name__)
+
+
+class GracefulRequestHandler(SimpleRequestHandler):
+    """SimpleRequestHandler, который при остановке дожидается фоновых апдейтов."""
+
+    def __init__(self, *args, shutdown_timeout: float, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.shutdown_timeout = shutdown_timeout
+
+    async def close(self) -> None:
+        # Фоновые задачи aiogram хранит в _background_feed_update_tasks;
+        # сессия бота закрывается только после них
+        pending = set(self._background_feed_update_tasks)
+        if pending:
+            logger.info(f"Waiting for {len(pending)} in-flight updates")
+            _, pending = await asyncio.wait(pending, timeout=self.shutdown_timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                logger.warning(f"Cancelled {len(pending)} updates after {self.shutdown_timeout}s")
+        await super().close()
+
+
+async def health(request: web.Request) -> web.Response:
+    """Проверка живости для балансировщика."""
+    return web.json_response({'status': 'ok'})
+
+
+async def metrics(request: web.Request) -> web.Response:
+    """Метрики клиента Django API: размыкатель цепи, повторы, кэши."""
+    return web.json_response(api_client.stats())
+
+
+def build_app(dp: Dispatcher, bot: Bot) -> web.Application:
+    """Собирает aiohttp приложение с обработчиком webhook."""
+    app = web.Application()
+
+    async def on_startup(app: web.Application):
+        # Общий пул соединений к Django API на все время работы сервера
+        await api_client.start()
+        if WEBHOOK_BASE_URL:
+            await bot.set_webhook(
+                f'{WEBHOOK_BASE_URL}{WEBHOOK_PATH}',
+                secret_token=WEBHOOK_SECRET,
+                max_connections=WEBHOOK_MAX_CONNECTIONS,
+                allowed_updates=dp.resolve_used_update_types(),
+            )
+            logger.info(f"Webhook set to {WEBHOOK_BASE_URL}{WEBHOOK_PATH}")
+        else:
+            logger.info("WEBHOOK_BASE_URL is not set, webhook registration skipped")
+
+    async def on_cleanup(app: web.Application):
+        # Вебхук не удаляем: остальные реплики продолжают принимать апдейты
+        await api_client.close()
+        await dp.storage.close()
+
+    app.on_startup.append(on_startup)
+    # Обработчик регистрируется до setup_application: его close (ожидание
+    # апдейтов) выполняется раньше остановки диспетчера
+    GracefulRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        secret_token=WEBHOOK_SECRET,
+        shutdown_timeout=WEBHOOK_SHUTDOWN_TIMEOUT,
+    ).register(app, path=WEBHOOK_PATH)
+    app.router.add_get('/healthz', health)
+    app.router.add_get('/metrics', metrics)
+    setup_application(app, dp, bot=bot)
+    app.on_cleanup.append(on_cleanup)
+    return app
+
+
+def run_webhook(dp: Dispatcher, bot: Bot):
+    """Запускает webhook сервер (SIGINT/SIGTERM - мягкая остановка)."""
+    logger.info(f"Webhook server listening on {WEBAPP_HOST}:{WEBAPP_PORT}{WEBHOOK_PATH}")
+    web.run_app(
+        build_app(dp, bot),
+        host=WEBAPP_HOST,
+        port=WEBAPP_PORT,
+        shutdown_timeout=WEBHOOK_SHUTDOWN_TIMEOUT,
+        # Строка access лога на каждый апдейт - лишняя нагрузка
+        access_log=None,
+        print=None,
+    )
@@ -0,0 +1,110 @@
+"""
+Нагрузочный тест webhook сервера бота.
+
+Отправляет синтетические апдейты (сообщения от разных пользователей) на
+локальный экземпляр, запущенный с BOT_MODE=webhook, и печатает пропускную
+способность и задержки ответа. Пример:
+
+    BOT_MODE=webhook WEBHOOK_SECRET=secret python main.py
+    python webhook_load_test.py --secret secret --updates 5000 --concurrency 100
+
+Текст сообщений по умолчанию не совпадает ни с одной командой, поэтому
+обработка не обращается к Telegram API. Перед замером проверяется, что
+запрос с неверным секретом отклоняется.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+
+import aiohttp
+
+
+def make_update(update_id: int, user_id: int, text: str) -> dict:
+    """Апдейт с текстовым сообщением в личном чате."""
+    user = {'id': user_id, 'is_bot': False, 'first_name': f'Load{user_id}'}
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private', 'first_name': user['first_name']},
+            'from': user,
+            'text': text,
+        },
+    }
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+async def check_secret(session: aiohttp.ClientSession, url: str):
+    """Апдейт с неверным секретом должен получить 401."""
+    async with session.post(
+        url, json=make_update(0, 1, 'secret check'),
+        headers={'X-Telegram-Bot-Api-Secret-Token': 'wrong-secret'}
+    ) as response:
+        if response.status != 401:
+            raise SystemExit(f'Wrong secret accepted: HTTP {response.status}')
+
+
+async def run(args):
+    url = args.url.rstrip('/') + args.path
+    headers = {'X-Telegram-Bot-Api-Secret-Token': args.secret}
+    statuses = Counter()
+    latencies = []
+    queue = asyncio.Queue()
+    for update_id in range(1, args.updates + 1):
+        queue.put_nowait(update_id)
+
+    async def worker(session: aiohttp.ClientSession):
+        while not queue.empty():
+            update_id = queue.get_nowait()
+            update = make_update(update_id, random.randint(1, args.users), args.text)
+            started = time.perf_counter()
+            try:
+                async with session.post(url, json=update, headers=headers) as response:
+                    await response.read()
+                    statuses[response.status] += 1
+            except aiohttp.ClientError as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    async with aiohttp.ClientSession(connector=connector) as session:
+        await check_secret(session, url)
+        started = time.perf_counter()
+        await asyncio.gather(*(worker(session) for _ in range(args.concurrency)))
+        elapsed = time.perf_counter() - started
+
+    print(f'updates: {args.updates}, concurrency: {args.concurrency}, users: {args.users}')
+    print(f'statuses: {dict(statuses)}')
+    print(f'elapsed: {elapsed:.2f} s, {args.updates / elapsed:.0f} updates/s')
+    print(
+        'latency ms: '
+        f'p50 {percentile(latencies, 0.5) * 1000:.1f}, '
+        f'p95 {percentile(latencies, 0.95) * 1000:.1f}, '
+        f'p99 {percentile(latencies, 0.99) * 1000:.1f}, '
+        f'max {max(latencies, default=0) * 1000:.1f}'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Нагрузочный тест webhook сервера бота')
+    parser.add_argument('--url', default='http://localhost:8080', help='Адрес сервера')
+    parser.add_argument('--path', default='/webhook', help='Путь webhook (WEBHOOK_PATH)')
+    parser.add_argument('--secret', required=True, help='WEBHOOK_SECRET сервера')
+    parser.add_argument('--updates', type=int, default=2000, help='Количество апдейтов')
+    parser.add_argument('--concurrency', type=int, default=50, help='Одновременных запросов')
+    parser.add_argument('--users', type=int, default=500, help='Количество разных пользователей')
+    parser.add_argument('--text', default='load test', help='Текст сообщений')
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()